@@ -0,0 +1,135 @@
+"""
+Performance regression gate: compare the benchmark suite against a stored
+baseline, and fail if any scenario got slower than a threshold.
+
+The suite is run several times, and each scenario is summarized by the
+median of its per-run p50 latencies, with the median absolute deviation
+(MAD) as its noise. A scenario regresses when its median is over the
+baseline by more than the threshold, and by more than the noise of both
+measurements, so that a noisy machine does not fail the gate on its own.
+
+Usage::
+  $ python -m benchmarks.compare bench-baseline.json --save
+  $ python -m benchmarks.compare bench-baseline.json --threshold 0.1
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from typing import Any, NamedTuple
+
+from .suite import run_suite
+
+# Scale of the MAD to estimate a standard deviation, for normal noise
+_MAD_SCALE = 1.4826
+
+
+class Comparison(NamedTuple):
+    name: str
+    baseline_ms: float
+    current_ms: float
+    noise_ms: float
+    regressed: bool
+
+    @property
+    def change(self) -> float:
+        return self.current_ms / self.baseline_ms - 1
+
+
+def mad(samples: list[float]) -> float:
+    """Return the median absolute deviation of `samples`."""
+    median = statistics.median(samples)
+    return statistics.median(abs(sample - median) for sample in samples)
+
+
+def measure(rounds: int, repeat: int, pattern: str = "") -> dict[str, Any]:
+    """Run the suite `rounds` times, and return the report of the first run
+    with the p50 latency of every run as samples of each scenario."""
+    reports = [run_suite(repeat, pattern) for _ in range(rounds)]
+    report: dict[str, Any] = reports[0]
+    for name, result in report["scenarios"].items():
+        result["samples_ms"] = [
+            r["scenarios"][name]["p50_ms"] for r in reports
+        ]
+    return report
+
+
+def _samples(result: dict[str, Any]) -> list[float]:
+    # Plain suite reports only hold a single p50
+    samples: list[float] = result.get("samples_ms") or [result["p50_ms"]]
+    return samples
+
+
+def compare(baseline: dict[str, Any],
+            current: dict[str, Any],
+            threshold: float,
+            sigmas: float = 3.0) -> list[Comparison]:
+    """Compare the scenarios measured in both reports."""
+    comparisons = []
+    for name, result in current["scenarios"].items():
+        if name not in baseline["scenarios"]:
+            continue
+        before = _samples(baseline["scenarios"][name])
+        after = _samples(result)
+        before_ms = statistics.median(before)
+        after_ms = statistics.median(after)
+        noise_ms = sigmas * _MAD_SCALE * max(mad(before), mad(after))
+        regressed = (after_ms > before_ms * (1 + threshold)
+                     and after_ms - before_ms > noise_ms)
+        comparisons.append(
+            Comparison(name, before_ms, after_ms, noise_ms, regressed))
+    return comparisons
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("baseline", help="baseline JSON report")
+    parser.add_argument("--save",
+                        action="store_true",
+                        help="measure and save the baseline instead")
+    parser.add_argument("--threshold",
+                        type=float,
+                        default=0.1,
+                        help="tolerated slowdown, 0.1 for 10%%")
+    parser.add_argument("--rounds",
+                        type=int,
+                        default=5,
+                        help="runs of the whole suite")
+    parser.add_argument("--repeat",
+                        type=int,
+                        default=30,
+                        help="runs per scenario and round")
+    parser.add_argument("--filter",
+                        default="",
+                        help="only run the scenarios containing this")
+    args = parser.parse_args()
+    if args.repeat < 2 or args.rounds < 1:
+        parser.error("--repeat must be at least 2, and --rounds at least 1")
+
+    current = measure(args.rounds, args.repeat, args.filter)
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    for key, value in current["environment"].items():
+        if baseline["environment"].get(key) != value:
+            print(f"{key} changed: {baseline['environment'].get(key)} -> "
+                  f"{value}")
+    comparisons = compare(baseline, current, args.threshold)
+    for c in comparisons:
+        status = "REGRESSED" if c.regressed else "ok"
+        print(
+            f"{c.name:<28} {c.baseline_ms:>9.3f}ms -> {c.current_ms:>9.3f}ms "
+            f"{c.change:>+8.1%} (noise {c.noise_ms:.3f}ms) {status}")
+    regressions = [c.name for c in comparisons if c.regressed]
+    if regressions:
+        sys.exit(f"{len(regressions)} scenario(s) regressed over "
+                 f"{args.threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
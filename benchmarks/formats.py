@@ -0,0 +1,55 @@
+"""
+Compare the encode time and size of the avatar image formats, per encode
+profile.
+
+Usage::
+  $ python -m benchmarks.formats --sizes 64 120 250 --repeat 50
+"""
+
+import argparse
+import statistics
+import time
+
+from pyavatar import (EncodeProfile,
+                      PyAvatar,
+                      SupportedImageFmt,
+                      available_formats)
+
+
+def measure(fmt: SupportedImageFmt,
+            profile: EncodeProfile,
+            size: int,
+            repeat: int) -> tuple[float, int]:
+    """Return the median encode time in milliseconds and the size in bytes
+    of an avatar."""
+    timings, data = [], b""
+    for i in range(repeat):
+        # A fresh avatar per run, so that its encodings are not memoized
+        avatar = PyAvatar(chr(ord("A") + i % 26),
+                          size=size,
+                          color=(40, 176, 200))
+        avatar.image  # rendering is not part of the encode time
+        start = time.perf_counter()
+        data = avatar.stream(fmt, profile)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, len(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 120, 250])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'format':<6} {'profile':<9} {'size':>5} {'encode ms':>10} "
+          f"{'bytes':>7}")
+    for fmt in available_formats():
+        for profile in EncodeProfile:
+            for size in args.sizes:
+                ms, length = measure(fmt, profile, size, args.repeat)
+                print(f"{fmt.value:<6} {profile.value:<9} {size:>5} "
+                      f"{ms:>10.3f} {length:>7}")
+
+
+if __name__ == "__main__":
+    main()
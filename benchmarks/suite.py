@@ -0,0 +1,222 @@
+"""
+Benchmark suite of pyavatar, reported as JSON so that runs can be compared.
+
+Scenarios cover building avatars, rendering them with a cold or warm font,
+encoding them to every available format, across the supported sizes, and
+the single versus the batch APIs. Each scenario reports its throughput,
+latency percentiles and memory use.
+
+Memory is measured as the peak resident set size of a fresh process running
+the scenario once, so that it covers the image buffers Pillow allocates
+outside of the Python heap. ``peak_rss_bytes`` includes the interpreter and
+its imports, ``rss_growth_bytes`` is how much the scenario raised the peak.
+
+Usage::
+  $ python -m benchmarks.suite --output bench.json
+  $ python -m benchmarks.suite --filter stream/ --repeat 200
+"""
+
+import argparse
+import json
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from typing import Any, Callable, NamedTuple
+
+from PIL import __version__ as PIL_VERSION
+
+import pyavatar
+from pyavatar import (PyAvatar,
+                      SupportedImageFmt,
+                      SupportedPixelRange,
+                      available_formats,
+                      clear_font_cache,
+                      clear_glyph_cache,
+                      generate_many)
+
+SIZES = (SupportedPixelRange.MIN.value, 120, SupportedPixelRange.MAX.value)
+BATCH = [f"user{i}" for i in range(100)]
+COLOR = (40, 176, 200)
+
+
+class Scenario(NamedTuple):
+    name: str
+    run: Callable[[], object]
+    # Untimed, called before each run
+    setup: Callable[[], object] | None = None
+    # Number of avatars produced by a run
+    ops: int = 1
+
+
+def _cold_fonts() -> None:
+    clear_font_cache()
+    clear_glyph_cache()
+
+
+def _render(size: int) -> None:
+    PyAvatar("W", size, color=COLOR).image
+
+
+def _stream(fmt: SupportedImageFmt, size: int) -> None:
+    PyAvatar("W", size, color=COLOR).stream(fmt)
+
+
+def _single(names: list[str]) -> None:
+    for name in names:
+        PyAvatar(name, deterministic=True).stream()
+
+
+def _batch(names: list[str]) -> None:
+    for _ in generate_many(names, deterministic=True):
+        pass
+
+
+def scenarios(directory: str) -> list[Scenario]:
+    """Return every scenario of the suite, saving files under
+    `directory`."""
+    avatar = partial(PyAvatar, "W", color=COLOR)
+    found = [Scenario("init", partial(PyAvatar, "smallwat3r", color=COLOR))]
+    for size in SIZES:
+        found.append(
+            Scenario(f"render/cold-font/{size}",
+                     partial(_render, size),
+                     setup=_cold_fonts))
+        found.append(
+            Scenario(f"render/warm-font/{size}", partial(_render, size)))
+        for fmt in available_formats():
+            found.append(
+                Scenario(f"stream/{fmt.value}/{size}",
+                         partial(_stream, fmt, size)))
+    found.append(
+        Scenario("save/png/120",
+                 lambda: avatar().save(f"{directory}/avatar.png")))
+    found.append(
+        Scenario("base64_image/png/120", lambda: avatar().base64_image()))
+    found.append(
+        Scenario(f"single/stream/{len(BATCH)}",
+                 partial(_single, BATCH),
+                 ops=len(BATCH)))
+    found.append(
+        Scenario(f"batch/generate_many/{len(BATCH)}",
+                 partial(_batch, BATCH),
+                 ops=len(BATCH)))
+    return found
+
+
+def _percentile(timings: list[float], percent: int) -> float:
+    return statistics.quantiles(timings, n=100,
+                                method="inclusive")[percent - 1]
+
+
+def _max_rss() -> int:
+    """Return the peak resident set size of this process, in bytes."""
+    # On Linux, ru_maxrss carries the peak of the parent over fork and exec
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kilobytes
+
+
+def _run_once(name: str) -> tuple[int, int]:
+    """Run a scenario once, and return the peak RSS of the process before
+    and after it."""
+    with tempfile.TemporaryDirectory() as directory:
+        scenario = next(s for s in scenarios(directory) if s.name == name)
+        if scenario.setup is not None:
+            scenario.setup()
+        before = _max_rss()
+        scenario.run()
+        return before, _max_rss()
+
+
+def measure_memory(name: str) -> tuple[int, int]:
+    """Run a scenario once in a new process, and return the peak RSS of
+    this process before and after running it."""
+    with ProcessPoolExecutor(max_workers=1,
+                             mp_context=get_context("spawn")) as executor:
+        return executor.submit(_run_once, name).result()
+
+
+def measure(scenario: Scenario, repeat: int) -> dict[str, Any]:
+    """Run a scenario `repeat` times, and return its statistics."""
+    scenario.run()  # warm up imports, caches and pools
+    timings = []
+    for _ in range(repeat):
+        if scenario.setup is not None:
+            scenario.setup()
+        start = time.perf_counter()
+        scenario.run()
+        timings.append((time.perf_counter() - start) / scenario.ops)
+    before, peak = measure_memory(scenario.name)
+    return {
+        "runs": repeat,
+        "ops_per_sec": 1 / statistics.mean(timings),
+        "mean_ms": statistics.mean(timings) * 1000,
+        "p50_ms": _percentile(timings, 50) * 1000,
+        "p90_ms": _percentile(timings, 90) * 1000,
+        "p99_ms": _percentile(timings, 99) * 1000,
+        "peak_rss_bytes": peak,
+        "rss_growth_bytes": peak - before,
+    }
+
+
+def run_suite(repeat: int = 50, pattern: str = "") -> dict[str, Any]:
+    """Run every scenario whose name contains `pattern`, and return the
+    report."""
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            scenario.name: measure(scenario, repeat)
+            for scenario in scenarios(directory)
+            if pattern in scenario.name
+        }
+    return {
+        "environment": {
+            "pyavatar": pyavatar.__version__,
+            "pillow": PIL_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--repeat",
+                        type=int,
+                        default=50,
+                        help="runs per scenario")
+    parser.add_argument("--filter",
+                        default="",
+                        help="only run the scenarios containing this")
+    parser.add_argument("--output", help="JSON report file, or stdout")
+    args = parser.parse_args()
+    if args.repeat < 2:
+        parser.error("--repeat must be at least 2")
+
+    report = run_suite(args.repeat, args.filter)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    for name, result in report["scenarios"].items():
+        print(
+            f"{name:<28} {result['ops_per_sec']:>10.1f} ops/s "
+            f"p50 {result['p50_ms']:>8.3f}ms p99 {result['p99_ms']:>8.3f}ms",
+            file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Asyncio API, rendering avatars off the event loop.
+"""
+
+import asyncio
+import functools
+import os
+import weakref
+from concurrent.futures import Executor
+from typing import Any
+
+from ._avatar import (_DEFAULT_IMAGE_SIZE,
+                      EncodeProfile,
+                      PyAvatar,
+                      SupportedImageFmt,
+                      base64_uri,
+                      encode_profile,
+                      image_format)
+from ._singleflight import AsyncSingleFlight
+
+_executor: Executor | None = None
+_max_concurrency = os.cpu_count() or 1
+_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop,
+                                       asyncio.Semaphore]
+_semaphores = weakref.WeakKeyDictionary()
+_flights: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop,
+                                    AsyncSingleFlight[bytes]]
+_flights = weakref.WeakKeyDictionary()
+
+
+def configure_async(executor: Executor | None = None,
+                    max_concurrency: int | None = None) -> None:
+    """Configure how the async API offloads rendering.
+
+    Should be called before the first render of an event loop.
+
+    :param executor: (optional) Executor running the renders, the default
+                     executor of the event loop if unset.
+    :param max_concurrency: (optional) Maximum number of renders submitted
+                            to the executor at once, per event loop. Other
+                            renders wait on the event loop. The CPU count
+                            if unset.
+    """
+    global _executor, _max_concurrency
+    if max_concurrency is not None and max_concurrency < 1:
+        raise ValueError(
+            "Argument `max_concurrency` must be a positive integer.")
+    _executor = executor
+    _max_concurrency = max_concurrency or os.cpu_count() or 1
+    _semaphores.clear()
+
+
+def _semaphore(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(_max_concurrency)
+    return semaphore
+
+
+async def render_async(text: str,
+                       size: int = _DEFAULT_IMAGE_SIZE,
+                       fmt: SupportedImageFmt | str = SupportedImageFmt.PNG,
+                       profile: EncodeProfile | str | None = None,
+                       **options: Any) -> bytes:
+    """Render and encode an avatar without blocking the event loop.
+
+    Concurrent calls for the same avatar are coalesced into a single render.
+    Cancelling every call waiting for a render, while it waits for a
+    rendering slot, drops the render. Once submitted to the executor, the
+    render keeps its slot until it is done, even if cancelled.
+
+    :param text: Input text to use in the avatar.
+    :param size: (optional) Integer, size in pixel of the avatar.
+    :param fmt: (optional) Avatar file format.
+    :param profile: (optional) Encode profile, the default one if unset.
+    :param options: (optional) Any other `PyAvatar` parameter, such as
+                    `fontpath` or `deterministic`.
+    :rtype: bytes
+
+    Usage::
+      >>> from pyavatar import render_async
+      >>> data = await render_async("smallwat3r", size=200, fmt="png")
+    """
+    fmt = image_format(fmt)
+    profile = encode_profile(profile)
+    avatar = PyAvatar(text, size=size, **options)
+    loop = asyncio.get_running_loop()
+    flights = _flights.get(loop)
+    if flights is None:
+        flights = _flights[loop] = AsyncSingleFlight()
+    return await flights.do(avatar.cache_key(fmt, profile),
+                            lambda: _render(loop, avatar, fmt, profile))
+
+
+async def _render(loop: asyncio.AbstractEventLoop,
+                  avatar: PyAvatar,
+                  fmt: SupportedImageFmt,
+                  profile: EncodeProfile) -> bytes:
+    semaphore = _semaphore(loop)
+    await semaphore.acquire()
+    try:
+        future = loop.run_in_executor(
+            _executor, functools.partial(avatar.stream, fmt, profile))
+    except BaseException:
+        semaphore.release()
+        raise
+    # The executor keeps rendering when the caller is cancelled, so the
+    # slot is only released once the render is done.
+    future.add_done_callback(lambda _: semaphore.release())
+    return await asyncio.shield(future)
+
+
+async def base64_image_async(text: str,
+                             size: int = _DEFAULT_IMAGE_SIZE,
+                             fmt: SupportedImageFmt
+                             | str = SupportedImageFmt.PNG,
+                             profile: EncodeProfile | str | None = None,
+                             **options: Any) -> str:
+    """Render an avatar as a base64 image without blocking the event loop.
+
+    Takes the same parameters as `render_async`.
+
+    :rtype: str
+    """
+    fmt = image_format(fmt)
+    data = await render_async(text, size, fmt, profile, **options)
+    return base64_uri(data, fmt)
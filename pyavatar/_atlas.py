@@ -0,0 +1,139 @@
+"""
+Sprite atlases: one image holding the avatars of a whole alphabet.
+"""
+
+import json
+import math
+from typing import Iterable, NamedTuple, Sequence
+
+from PIL import Image
+
+from ._avatar import (_DEFAULT_FONT_FILEPATH,
+                      _DEFAULT_IMAGE_SIZE,
+                      _TEXT_COLOR,
+                      EncodeProfile,
+                      ImageExtensionNotSupportedError,
+                      PyAvatar,
+                      SupportedImageFmt,
+                      _HexColor,
+                      _RGBColor,
+                      base64_uri,
+                      color_from_text,
+                      encode_profile,
+                      encode_with_profile,
+                      image_format)
+from ._glyphs import get_glyph
+
+
+class Atlas(NamedTuple):
+    """Encoded sprite sheet, and the offset of each character in it."""
+    data: bytes
+    fmt: SupportedImageFmt
+    size: int
+    width: int
+    height: int
+    offsets: dict[str, tuple[int, int]]
+
+    def manifest(self) -> dict[str, object]:
+        """Return the description of the sheet and of its sprites."""
+        return {
+            "format": self.fmt.value,
+            "size": self.size,
+            "width": self.width,
+            "height": self.height,
+            "sprites": {
+                char: {
+                    "x": x, "y": y
+                }
+                for char, (x, y) in self.offsets.items()
+            },
+        }
+
+    def manifest_json(self) -> str:
+        """Return the manifest of the atlas, as JSON."""
+        return json.dumps(self.manifest(), ensure_ascii=False)
+
+    def css(self, url: str | None = None, prefix: str = "avatar-") -> str:
+        """Return CSS classes displaying each sprite of the atlas.
+
+        Classes are named after the code point of their character, e.g.
+        ``.avatar-41`` for "A".
+
+        :param url: (optional) URL of the sheet, embedded as a base64 image
+                    if unset.
+        :param prefix: (optional) Prefix of the class names.
+        :rtype: str
+        """
+        url = url or base64_uri(self.data, self.fmt)
+        rules = [(f".{prefix}sprite {{ width: {self.size}px; "
+                  f"height: {self.size}px; "
+                  f"background: url(\"{url}\") no-repeat; }}")]
+        for char, (x, y) in self.offsets.items():
+            rules.append(f".{prefix}{ord(char):x} {{ "
+                         f"background-position: -{x}px -{y}px; }}")
+        return "\n".join(rules) + "\n"
+
+
+def build_atlas(
+        chars: Iterable[str],
+        size: int = _DEFAULT_IMAGE_SIZE,
+        fmt: SupportedImageFmt | str = SupportedImageFmt.PNG,
+        profile: EncodeProfile | str | None = None,
+        columns: int | None = None,
+        fontpath: str = _DEFAULT_FONT_FILEPATH,
+        color: _HexColor | _RGBColor | None = None,
+        seed: str = "",
+        palette: Sequence[_HexColor | _RGBColor] | None = None) -> Atlas:
+    """Render the avatars of a set of characters into a single sheet.
+
+    Each character is drawn once from the glyph cache. Without a given
+    color, the background of each avatar is derived from its character, as
+    with `PyAvatar(..., deterministic=True)`.
+
+    :param chars: Characters to render, duplicates are ignored.
+    :param size: (optional) Integer, size in pixel of each avatar.
+    :param fmt: (optional) Sheet file format, any but SVG.
+    :param profile: (optional) Encode profile, the default one if unset.
+    :param columns: (optional) Number of avatars per row, to get a square
+                    sheet if unset.
+    :param fontpath: (optional) Filepath to the font file to use, or name
+                     of a registered font.
+    :param color: (optional) hex or rgb color code of every background.
+    :param seed: (optional) Salt of the derived colors.
+    :param palette: (optional) Colors the derived colors are picked from.
+    :rtype: Atlas
+
+    Usage::
+      >>> import string
+      >>> from pyavatar import build_atlas
+      >>> atlas = build_atlas(string.ascii_uppercase, size=64)
+      >>> atlas.offsets["C"]
+      (128, 0)
+      >>> css = atlas.css("/static/avatars.png")
+    """
+    fmt = image_format(fmt)
+    if fmt is SupportedImageFmt.SVG:
+        raise ImageExtensionNotSupportedError(
+            fmt.value, info="Atlases are raster images.")
+    profile = encode_profile(profile)
+    chars = list(dict.fromkeys(chars))
+    # Validate the parameters like any avatar
+    fontpath = PyAvatar("a", size=size, fontpath=fontpath).fontpath
+    if not chars:
+        raise ValueError("Argument `chars` must not be empty.")
+    if any(len(char) != 1 for char in chars):
+        raise ValueError("Argument `chars` must only hold characters.")
+    columns = columns or math.ceil(math.sqrt(len(chars)))
+    rows = math.ceil(len(chars) / columns)
+    sheet = Image.new(mode="RGB", size=(columns * size, rows * size))
+    offsets = {}
+    for index, char in enumerate(chars):
+        x, y = index % columns * size, index // columns * size
+        background = color or color_from_text(char, seed, palette)
+        sheet.paste(background, (x, y, x + size, y + size))
+        glyph = get_glyph(char, fontpath, size)
+        sheet.paste(_TEXT_COLOR, (x + glyph.offset[0], y + glyph.offset[1]),
+                    glyph.mask)
+        offsets[char] = (x, y)
+    data = encode_with_profile(sheet, fmt, profile)
+    return Atlas(data, fmt, size, sheet.width, sheet.height, offsets)
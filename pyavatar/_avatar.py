@@ -0,0 +1,750 @@
+"""
+Generation of avatars.
+"""
+
+import copy
+import hashlib
+import mmap
+import os
+import random
+import zlib
+from base64 import b64encode
+from enum import Enum, IntEnum
+from io import BytesIO
+from typing import Any, Protocol, Sequence, TypeAlias
+
+from PIL import Image, ImageColor, ImageFont
+from PIL import __version__ as PIL_VERSION
+
+from . import _instrument
+from ._fonts import (add_font_data,
+                     font_digest,
+                     forget_font,
+                     validated_fontpaths)
+from ._glyphs import Glyph, downsample, forget_glyphs, get_glyph
+from ._output import (OutputKey,
+                      encode,
+                      forget_outputs,
+                      get_cache_backend,
+                      get_output,
+                      palette_bits,
+                      palette_image,
+                      put_output)
+from ._svg import forget_outlines, outlines_available, svg_image
+from ._version import __version__
+
+
+class PyAvatarError(Exception):
+    """Base PyAvatar error."""
+
+    def __init__(self, value: str, message: str = "", info: str = "") -> None:
+        self.value = value
+        self.message = message or self.__doc__
+        self.info = info
+        super().__init__(self.message)
+
+    def __str__(self) -> str:
+        return f"{self.value} -> {self.message} {self.info}".strip()
+
+
+class RenderingSizeError(PyAvatarError):
+    """Error with the chosen rendering size."""
+
+
+class FontpathError(PyAvatarError):
+    """Cannot find a font file at this location."""
+
+
+class FontExtensionNotSupportedError(PyAvatarError):
+    """Font file extension not supported."""
+
+
+class FontDataError(PyAvatarError):
+    """Cannot read a font from this data."""
+
+
+class ImageExtensionNotSupportedError(PyAvatarError):
+    """Image extension not supported."""
+
+
+class EncodeProfileNotSupportedError(PyAvatarError):
+    """Encode profile not supported."""
+
+
+def csv(str_enum: type[Enum]) -> str:
+    assert issubclass(str_enum, str) and issubclass(str_enum, Enum)
+    return ", ".join(list(str_enum))
+
+
+class SupportedImageFmt(str, Enum):
+    PNG = "png"
+    JPEG = "jpeg"
+    ICO = "ico"
+    SVG = "svg"
+    WEBP = "webp"
+    AVIF = "avif"
+
+
+class EncodeProfile(str, Enum):
+    FASTEST = "fastest"
+    BALANCED = "balanced"
+    SMALLEST = "smallest"
+
+
+# Pillow save options of each image format, per encode profile. Avatars are
+# mostly flat colors, which zlib run-length encoding handles very well. WebP
+# is lossless but with the smallest profile, which trades exact anti-aliasing
+# for smaller files when it pays off, see `_SMALLEST_ALTERNATIVES`.
+_ENCODE_OPTIONS: dict[EncodeProfile, dict[SupportedImageFmt, dict[str, Any]]]
+_ENCODE_OPTIONS = {
+    EncodeProfile.FASTEST: {
+        SupportedImageFmt.PNG: {
+            "compress_level": 1, "compress_type": zlib.Z_RLE
+        },
+        SupportedImageFmt.JPEG: {},
+        SupportedImageFmt.ICO: {},
+        SupportedImageFmt.WEBP: {
+            "lossless": True, "quality": 25, "method": 2
+        },
+        SupportedImageFmt.AVIF: {
+            "speed": 10
+        },
+    },
+    EncodeProfile.BALANCED: {
+        SupportedImageFmt.PNG: {
+            "compress_level": 6, "compress_type": zlib.Z_RLE
+        },
+        SupportedImageFmt.JPEG: {
+            "optimize": True
+        },
+        SupportedImageFmt.ICO: {},
+        SupportedImageFmt.WEBP: {
+            "lossless": True, "quality": 50, "method": 4
+        },
+        SupportedImageFmt.AVIF: {
+            "speed": 6
+        },
+    },
+    EncodeProfile.SMALLEST: {
+        SupportedImageFmt.PNG: {
+            "optimize": True
+        },
+        SupportedImageFmt.JPEG: {
+            "optimize": True, "progressive": True
+        },
+        SupportedImageFmt.ICO: {},
+        SupportedImageFmt.WEBP: {
+            "quality": 60, "method": 6
+        },
+        SupportedImageFmt.AVIF: {
+            "quality": 60, "speed": 0
+        },
+    },
+}
+
+# Other save options tried by the smallest profile, which keeps the smallest
+# output. Lossy WebP is smaller for most colors, but not for every one.
+_SMALLEST_ALTERNATIVES: dict[SupportedImageFmt, tuple[dict[str, Any], ...]]
+_SMALLEST_ALTERNATIVES = {
+    fmt: (_ENCODE_OPTIONS[EncodeProfile.FASTEST][fmt],
+          _ENCODE_OPTIONS[EncodeProfile.BALANCED][fmt])
+    for fmt in (SupportedImageFmt.WEBP, )
+}
+
+# PNG avatars are encoded as palette images, with a gradient of this many
+# colors between the background and the text color.
+_PNG_PALETTE_LEVELS: dict[EncodeProfile, int] = {
+    EncodeProfile.FASTEST: 16,
+    EncodeProfile.BALANCED: 256,
+    EncodeProfile.SMALLEST: 16,
+}
+
+_default_encode_profile = EncodeProfile.BALANCED
+
+
+def available_formats() -> tuple[SupportedImageFmt, ...]:
+    """Return the image formats this installation can encode, WebP and AVIF
+    depend on how Pillow was built.
+
+    Usage::
+      >>> import pyavatar
+      >>> pyavatar.available_formats()
+      (<SupportedImageFmt.PNG: 'png'>, <SupportedImageFmt.JPEG: 'jpeg'>, ...)
+    """
+    Image.init()
+    return tuple(
+        fmt for fmt in SupportedImageFmt
+        if fmt is SupportedImageFmt.SVG or fmt.value.upper() in Image.SAVE)
+
+
+def image_format(value: SupportedImageFmt | str) -> SupportedImageFmt:
+    if value.lower() not in set(SupportedImageFmt):
+        raise ImageExtensionNotSupportedError(
+            value, info=f"Supported formats: {csv(SupportedImageFmt)}.")
+    fmt = SupportedImageFmt(value.lower())
+    available = available_formats()
+    if fmt not in available:
+        raise ImageExtensionNotSupportedError(
+            value,
+            info=("Pillow cannot encode it here, available formats: "
+                  f"{', '.join(available)}."))
+    return fmt
+
+
+def base64_uri(data: bytes, fmt: SupportedImageFmt) -> str:
+    encoded_image = b64encode(data).decode("utf-8")
+    mime_type = "svg+xml" if fmt is SupportedImageFmt.SVG else fmt.value
+    return f"data:image/{mime_type};base64,{encoded_image}"
+
+
+def encode_profile(value: EncodeProfile | str | None) -> EncodeProfile:
+    if value is None:
+        return _default_encode_profile
+    if value not in set(EncodeProfile):
+        raise EncodeProfileNotSupportedError(
+            value, info=f"Supported profiles: {csv(EncodeProfile)}.")
+    return EncodeProfile(value)
+
+
+def encode_with_profile(image: Image.Image,
+                        fmt: SupportedImageFmt,
+                        profile: EncodeProfile) -> bytes:
+    """Encode an image with the save options of an encode profile."""
+    data = encode(image, fmt.value, _ENCODE_OPTIONS[profile][fmt])
+    if profile is EncodeProfile.SMALLEST:
+        for options in _SMALLEST_ALTERNATIVES.get(fmt, ()):
+            data = min(data, encode(image, fmt.value, options), key=len)
+    return data
+
+
+def set_default_encode_profile(profile: EncodeProfile | str) -> None:
+    """Set the encode profile used when none is given to `save`, `stream`
+    or `base64_image`.
+
+    :param profile: "fastest", "balanced" (default) or "smallest".
+    """
+    global _default_encode_profile
+    _default_encode_profile = encode_profile(profile)
+
+
+class SupportedFontExt(str, Enum):
+    TTF = ".ttf"
+    OTF = ".otf"
+
+
+class SupportedPixelRange(IntEnum):
+    MIN = 50
+    MAX = 650
+
+
+_DEFAULT_IMAGE_SIZE = 120
+_DEFAULT_FILEPATH = f"{os.getcwd()}/avatar.png"
+_DEFAULT_FONT_FILEPATH = os.path.join(os.path.dirname(__file__),
+                                      "font/Lora.ttf")
+
+# Fonts registered by name, and by path, which are trusted without any I/O.
+_registered_fonts: dict[str, str] = {}
+
+
+def _validate_fontpath(value: str) -> str:
+    fontpath = _registered_fonts.get(value)
+    if fontpath is not None:
+        return fontpath
+    if validated_fontpaths.get(value):
+        return value
+    if not os.path.exists(value):
+        raise FontpathError(value)
+    if not value.lower().endswith(tuple(SupportedFontExt)):
+        raise FontExtensionNotSupportedError(
+            os.path.basename(value),
+            info=f"Supported extensions: {csv(SupportedFontExt)}.")
+    validated_fontpaths.put(value, True)
+    return value
+
+
+class _FontResource(Protocol):
+    """Font file in a package, such as an `importlib.resources` file, which
+    can be inside a zip or a wheel."""
+
+    @property
+    def name(self) -> str:
+        ...
+
+    def read_bytes(self) -> bytes:
+        ...
+
+
+_FontSource: TypeAlias = str | bytes | mmap.mmap | _FontResource
+
+
+def register_font(name: str, source: _FontSource) -> None:
+    """Register a font under a name, to use as `fontpath` of avatars.
+
+    A font file given by path is validated once, and is then used without
+    any filesystem access, by name or by path. A font can also be given as
+    data (bytes, or a memory-mapped font file), or as a package resource,
+    in which case it is read once and every size of the font is loaded
+    from this in-memory copy. Registering another font under the same name
+    replaces it, and drops everything cached from the previous one.
+
+    :param name: Name of the font.
+    :param source: Filepath to the font file, font data, or package
+                   resource.
+    :type source: str, bytes, mmap or importlib.resources file
+
+    Usage::
+      >>> import pyavatar
+      >>> pyavatar.register_font("roboto", "/usr/share/fonts/Roboto.ttf")
+      >>> avatar = pyavatar.PyAvatar("smallwat3r", fontpath="roboto")
+      >>> avatar.fontpath
+      '/usr/share/fonts/Roboto.ttf'
+      >>> from importlib.resources import files
+      >>> pyavatar.register_font("inter", files("myapp") / "Inter.otf")
+      >>> pyavatar.PyAvatar("smallwat3r", fontpath="inter").fontpath
+      'inter'
+    """
+    if not isinstance(name, str):
+        raise TypeError("Font `name` must be a string.")
+    if isinstance(source, str):
+        fontpath = _validate_fontpath(source)
+        _forget_font(name)
+        _registered_fonts[name] = _registered_fonts[fontpath] = fontpath
+        return
+    if isinstance(source, bytes):
+        data = source
+    elif isinstance(source, mmap.mmap):
+        data = source[:]  # Pillow only reads fonts from bytes
+    elif hasattr(source, "read_bytes"):
+        if not source.name.lower().endswith(tuple(SupportedFontExt)):
+            raise FontExtensionNotSupportedError(
+                source.name,
+                info=f"Supported extensions: {csv(SupportedFontExt)}.")
+        data = source.read_bytes()
+    else:
+        raise TypeError("Font `source` must be a filepath, bytes, an mmap "
+                        "or a package resource.")
+    try:
+        ImageFont.truetype(BytesIO(data), size=10)
+    except OSError:
+        raise FontDataError(name) from None
+    _forget_font(name)
+    add_font_data(name, data)
+    _registered_fonts[name] = name
+
+
+def _forget_font(name: str) -> None:
+    """Drop everything cached from the font registered under `name`, if
+    any, which are all keyed by the name for fonts registered from
+    memory."""
+    if _registered_fonts.pop(name, None) is None:
+        return
+    forget_font(name)
+    forget_glyphs(name)
+    forget_outlines(name)
+    forget_outputs(name)
+
+
+register_font("lora", _DEFAULT_FONT_FILEPATH)
+
+_HexColor: TypeAlias = str
+_RGBColor: TypeAlias = tuple[int, int, int]
+
+_TEXT_COLOR: _RGBColor = (255, 255, 255)
+
+
+def _to_rgb(color: _HexColor | _RGBColor) -> tuple[int, ...]:
+    if isinstance(color, str):
+        return ImageColor.getrgb(color)
+    return tuple(color)
+
+
+def color_from_text(
+    text: str,
+    seed: str = "",
+    palette: Sequence[_HexColor | _RGBColor] | None = None
+) -> _HexColor | _RGBColor:
+    """Derive a stable background color from a text.
+
+    The same text, seed and palette always give the same color, across
+    processes and runs.
+
+    :param text: Text to derive the color from.
+    :param seed: (optional) Salt, to change the colors of every text.
+    :param palette: (optional) Colors to pick from, any color otherwise.
+    :rtype: string or tuple
+    """
+    digest = hashlib.blake2b(f"{seed}\0{text}".encode("utf-8"),
+                             digest_size=8).digest()
+    if palette:
+        return palette[int.from_bytes(digest, "big") % len(palette)]
+    return (digest[0], digest[1], digest[2])
+
+
+def _composite(glyph: Glyph, size: int,
+               color: _HexColor | _RGBColor) -> Image.Image:
+    """Draw a glyph in the text color over a background color."""
+    image = Image.new(mode="RGB", size=(size, size), color=color)
+    image.paste(_TEXT_COLOR, glyph.offset, glyph.mask)
+    return image
+
+
+class PyAvatar:
+    """Generate a default avatar from a given string input.
+
+    :param text: Input text to use in the avatar.
+    :param size: (optional) Integer, size in pixel of the avatar.
+    :param fontpath: (optional) Filepath to the font file to use, or name
+                     of a registered font. Fonts registered from memory
+                     keep their name as `fontpath`.
+    :param color: (optional) hex or rgb color code for the background.
+    :type color: string or tuple
+    :param capitalize: (optional) Boolean, capitalize the first letter.
+    :type capitalize: bool
+    :param deterministic: (optional) Boolean, derive the background color
+                          from the whole text instead of picking a random
+                          one, when no color is given.
+    :type deterministic: bool
+    :param seed: (optional) Salt of the deterministic colors.
+    :param palette: (optional) Colors the deterministic colors are picked
+                    from.
+
+    Edits to the rendered `image` are only encoded once the edited image is
+    assigned back to `image`.
+
+    Usage::
+      >>> from pyavatar import PyAvatar
+      >>> avatar = PyAvatar("smallwat3r", size=250)
+      >>> avatar.color
+      (191, 91, 81)
+      >>> avatar.change_color()
+      >>> avatar.color
+      (203, 22, 126)
+      >>> avatar.stream("png")
+      b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\xfa\x00\x00 ...'
+      >>> avatar.base64_image("jpeg")
+      'data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAgGBg ...'
+      >>> import os
+      >>> avatar.save(f"{os.getcwd()}/me.png")
+    """
+
+    def __init__(self,
+                 text: str,
+                 size: int = _DEFAULT_IMAGE_SIZE,
+                 fontpath: str = _DEFAULT_FONT_FILEPATH,
+                 color: _HexColor | _RGBColor | None = None,
+                 capitalize: bool = True,
+                 deterministic: bool = False,
+                 seed: str = "",
+                 palette: Sequence[_HexColor | _RGBColor] | None = None):
+        self._image: Image.Image | None = None
+        # Whether `image` was assigned, rather than rendered
+        self._image_set = False
+        self._glyph_mask: Glyph | None = None
+        # Factor of the larger glyph the glyph is reduced from, if not 1
+        self._supersample = 1
+        self._encoded: dict[tuple[SupportedImageFmt, EncodeProfile],
+                            bytes] = {}
+        self.text = text
+        if capitalize:
+            self.text = text.upper()
+        self.size = size
+        self.fontpath = fontpath
+        if not color and deterministic:
+            color = color_from_text(text, seed, palette)
+        self.color = color or self._random_color()
+
+    def __str__(self) -> str:
+        return f"{self.text} {self.size}x{self.size} {self.color}"
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, value: str) -> None:
+        if not isinstance(value, str):
+            raise TypeError("Attribute `text` must be a string.")
+        self._text = value[0]  # only care about the first character
+        self._invalidate()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @size.setter
+    def size(self, value: int) -> None:
+        if not isinstance(value, int):
+            raise TypeError("Attribute `size` must be an integer.")
+        if value < SupportedPixelRange.MIN or value > SupportedPixelRange.MAX:
+            raise RenderingSizeError(str(value),
+                                     ("Size must fit within range "
+                                      f"min={SupportedPixelRange.MIN} "
+                                      f"max={SupportedPixelRange.MAX}."))
+        self._size = value
+        self._invalidate()
+
+    @property
+    def fontpath(self) -> str:
+        return self._fontpath
+
+    @fontpath.setter
+    def fontpath(self, value: str) -> None:
+        if not isinstance(value, str):
+            raise TypeError("Attribute `fontpath` must be a string.")
+        self._fontpath = _validate_fontpath(value)
+        self._invalidate()
+
+    @property
+    def color(self) -> _HexColor | _RGBColor:
+        return self._color
+
+    @color.setter
+    def color(self, value: _HexColor | _RGBColor) -> None:
+        self._color = value
+        self._invalidate(keep_glyph=True)
+
+    @property
+    def image(self) -> Image.Image:
+        """The rendered avatar, drawn on first access, or the image last
+        assigned to it.
+
+        Outputs of a rendered avatar are encoded from its glyph and color,
+        and cached by them, so edits to this image are not saved, streamed or
+        encoded to base64 until it is assigned back to `image`.
+        """
+        if self._image is None:
+            if _instrument.enabled:
+                self._image = _instrument.observe(self.text,
+                                                  self.size,
+                                                  None,
+                                                  None,
+                                                  self.__generate_avatar)
+            else:
+                self._image = self.__generate_avatar()
+        return self._image
+
+    @image.setter
+    def image(self, value: Image.Image) -> None:
+        """Replace the avatar by an image, such as an edited render. Its
+        outputs are encoded from this image, without any shared cache."""
+        if not isinstance(value, Image.Image):
+            raise TypeError("Attribute `image` must be a PIL image.")
+        self._image = value
+        self._image_set = True
+        self._encoded.clear()
+
+    def _invalidate(self, keep_glyph: bool = False) -> None:
+        """Discard the render and its encodings, they are redrawn on next
+        access. The glyph only depends on the text, size and font, so a new
+        color is a fill and a composite against the kept glyph."""
+        self._image = None
+        self._image_set = False
+        self._encoded.clear()
+        if not keep_glyph:
+            self._glyph_mask = None
+
+    @staticmethod
+    def _random_color() -> _RGBColor:
+        return (random.randint(0, 255),
+                random.randint(0, 255),
+                random.randint(0, 255))
+
+    def _glyph(self) -> Glyph:
+        if self._glyph_mask is None:
+            if self._supersample == 1:
+                glyph = get_glyph(self.text, self.fontpath, self.size)
+            else:
+                glyph = downsample(
+                    get_glyph(self.text,
+                              self.fontpath,
+                              self.size * self._supersample),
+                    self.size,
+                    self._supersample)
+            self._glyph_mask = glyph
+        return self._glyph_mask
+
+    def _resized(self, size: int, supersample: int = 1) -> "PyAvatar":
+        """Return a copy of the avatar at another size, with its glyph
+        reduced from a `supersample` times larger one if not 1."""
+        avatar = copy.copy(self)
+        avatar._encoded = {}
+        avatar.size = size
+        avatar._supersample = supersample
+        return avatar
+
+    def __generate_avatar(self) -> Image.Image:
+        return _instrument.stage("composite",
+                                 _composite,
+                                 self._glyph(),
+                                 self.size,
+                                 self.color)
+
+    def cache_key(self,
+                  filetype: SupportedImageFmt = SupportedImageFmt.PNG,
+                  profile: EncodeProfile | str | None = None) -> OutputKey:
+        """Return a key identifying the encoded avatar, avatars with the same
+        key encode to the same bytes.
+
+        :param filetype: (optional) Avatar file format.
+        :param profile: (optional) Encode profile, the default one if unset.
+        :rtype: tuple
+        """
+        key: OutputKey = (self.text,
+                          self.size,
+                          _to_rgb(self.color),
+                          self.fontpath,
+                          image_format(filetype).value,
+                          encode_profile(profile).value)
+        if self._supersample != 1:
+            key += (self._supersample, )
+        return key
+
+    def _encode(self,
+                fmt: SupportedImageFmt,
+                profile: EncodeProfile | str | None) -> bytes:
+        profile = encode_profile(profile)
+        data = self._encoded.get((fmt, profile))
+        if data is None:
+            if _instrument.enabled:
+                data = _instrument.observe(
+                    self.text,
+                    self.size,
+                    fmt.value,
+                    profile.value, lambda: self.__encode_shared(fmt, profile))
+            else:
+                data = self.__encode_shared(fmt, profile)
+            self._encoded[(fmt, profile)] = data
+        return data
+
+    def __encode_shared(self, fmt: SupportedImageFmt,
+                        profile: EncodeProfile) -> bytes:
+        if self._image is not None and self._image_set:
+            # Not identified by the cache key, nor drawn from the glyph
+            if fmt is SupportedImageFmt.SVG:
+                raise ImageExtensionNotSupportedError(
+                    fmt.value,
+                    info="SVG avatars are drawn from their text, not from an "
+                    "assigned image.")
+            return _instrument.stage("encode",
+                                     encode_with_profile,
+                                     self._image,
+                                     fmt,
+                                     profile)
+        key = self.cache_key(fmt, profile)
+        data = get_output(key)
+        if data is None:
+            data = self.__encode_persisted(fmt, profile)
+            put_output(key, data)
+        return data
+
+    def _content_digest(self, fmt: SupportedImageFmt,
+                        profile: EncodeProfile) -> str:
+        """Return a digest of everything the encoded avatar depends on, to
+        address it in persistent caches."""
+        content: tuple[Any, ...] = (__version__,
+                                    PIL_VERSION,
+                                    self.text,
+                                    self.size,
+                                    _to_rgb(self.color),
+                                    font_digest(self.fontpath),
+                                    fmt.value,
+                                    profile.value)
+        if self._supersample != 1:
+            content += (self._supersample, )
+        if fmt is SupportedImageFmt.SVG:  # text without fontTools
+            content += (outlines_available(), )
+        return hashlib.sha256(repr(content).encode("utf-8")).hexdigest()
+
+    def __encode_persisted(self,
+                           fmt: SupportedImageFmt,
+                           profile: EncodeProfile) -> bytes:
+        backend = get_cache_backend()
+        if backend is None:
+            return self.__encode_image(fmt, profile)
+        key = self._content_digest(fmt, profile)
+        data = backend.get(key)
+        if _instrument.enabled:
+            _instrument.lookup("backend", hit=data is not None)
+        if data is None:
+            data = self.__encode_image(fmt, profile)
+            backend.put(key, data)
+        return data
+
+    def __encode_image(self, fmt: SupportedImageFmt,
+                       profile: EncodeProfile) -> bytes:
+        if fmt is SupportedImageFmt.SVG:
+            return _instrument.stage("encode",
+                                     svg_image,
+                                     self.text,
+                                     self.fontpath,
+                                     self.size,
+                                     _to_rgb(self.color),
+                                     _TEXT_COLOR)
+        if fmt is not SupportedImageFmt.PNG:
+            return _instrument.stage("encode",
+                                     encode_with_profile,
+                                     self.__generate_avatar(),
+                                     fmt,
+                                     profile)
+        levels = _PNG_PALETTE_LEVELS[profile]
+        image = _instrument.stage("composite",
+                                  palette_image,
+                                  self._glyph(),
+                                  self.size,
+                                  _to_rgb(self.color),
+                                  _TEXT_COLOR,
+                                  levels)
+        options = dict(_ENCODE_OPTIONS[profile][fmt],
+                       bits=palette_bits(levels))
+        return _instrument.stage("encode", encode, image, fmt.value, options)
+
+    def change_color(self, color: _HexColor | _RGBColor | None = None) -> None:
+        """Change the background color of the avatar.
+
+        :param color: (optional) hex or rgb color code for the background.
+        :type color: string or tuple
+        """
+        self.color = color or self._random_color()
+
+    def save(self,
+             filepath: str = _DEFAULT_FILEPATH,
+             profile: EncodeProfile | str | None = None) -> None:
+        """Save the avatar under a given file path.
+
+        :param filepath: (optional) Filepath where the avatar will be saved.
+        :param profile: (optional) Encode profile, the default one if unset.
+        """
+        extension = os.path.splitext(filepath)[1].split(".")[1]
+        if extension not in set(SupportedImageFmt):
+            raise ImageExtensionNotSupportedError(
+                os.path.basename(filepath),
+                info=f"Supported formats: {csv(SupportedImageFmt)}.")
+        data = self._encode(image_format(extension), profile)
+        directory = os.path.dirname(filepath)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(filepath, "wb") as f:
+            f.write(data)
+
+    def stream(self,
+               filetype: SupportedImageFmt = SupportedImageFmt.PNG,
+               profile: EncodeProfile | str | None = None) -> bytes:
+        """Save the avatar in a bytes array.
+
+        :param filetype: (optional) Avatar file format.
+        :param profile: (optional) Encode profile, the default one if unset.
+        :rtype: bytes
+        """
+        return self._encode(image_format(filetype), profile)
+
+    def base64_image(self,
+                     filetype: SupportedImageFmt = SupportedImageFmt.PNG,
+                     profile: EncodeProfile | str | None = None) -> str:
+        """Save the avatar as a base64 image.
+
+        :param filetype: (optional) Avatar file format.
+        :param profile: (optional) Encode profile, the default one if unset.
+        :rtype: str
+        """
+        fmt = image_format(filetype)
+        return base64_uri(self.stream(fmt, profile), fmt)
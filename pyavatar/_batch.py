@@ -0,0 +1,190 @@
+"""
+Generation of avatars in bulk.
+"""
+
+import os
+import random
+from collections import deque
+from concurrent.futures import (Executor,
+                                Future,
+                                ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, TypeAlias, TypeVar
+
+from ._avatar import (_DEFAULT_IMAGE_SIZE,
+                      EncodeProfile,
+                      PyAvatar,
+                      SupportedImageFmt,
+                      encode_profile,
+                      image_format,
+                      register_font)
+from ._fonts import font_data
+from ._singleflight import SingleFlight
+from ._warmup import DEFAULT_WARMUP_CHARACTERS, warmup
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+_flights: SingleFlight[bytes] = SingleFlight()
+
+
+def render(text: str,
+           size: int,
+           fmt: SupportedImageFmt,
+           profile: EncodeProfile,
+           options: dict[str, Any]) -> bytes:
+    """Render and encode a single avatar. Concurrent renders of the same
+    avatar are coalesced."""
+    avatar = PyAvatar(text, size=size, **options)
+    return _flights.do(avatar.cache_key(fmt, profile),
+                       lambda: avatar.stream(fmt, profile))
+
+
+def generate_many(items: Iterable[str],
+                  size: int = _DEFAULT_IMAGE_SIZE,
+                  fmt: SupportedImageFmt | str = SupportedImageFmt.PNG,
+                  workers: int | None = None,
+                  profile: EncodeProfile | str | None = None,
+                  **options: Any) -> Iterator[bytes]:
+    """Generate encoded avatars for many input strings, using a pool of
+    threads.
+
+    Fonts and glyphs are shared by every avatar through the process caches,
+    and Pillow releases the GIL while encoding. Results are yielded in the
+    order of `items`, which are consumed lazily: at most twice as many
+    avatars as workers are being generated at any time.
+
+    :param items: Input texts to use in the avatars.
+    :param size: (optional) Integer, size in pixel of the avatars.
+    :param fmt: (optional) Avatars file format.
+    :param workers: (optional) Number of threads, the CPU count if unset.
+    :param profile: (optional) Encode profile, the default one if unset.
+    :param options: (optional) Any other `PyAvatar` parameter, such as
+                    `fontpath` or `deterministic`.
+    :rtype: iterator of bytes
+
+    Usage::
+      >>> from pyavatar import generate_many
+      >>> for data in generate_many(usernames, size=200, deterministic=True):
+      ...     upload(data)
+    """
+    fmt = image_format(fmt)
+    profile = encode_profile(profile)
+    workers = workers or os.cpu_count() or 1
+    executor = ThreadPoolExecutor(max_workers=workers,
+                                  thread_name_prefix="pyavatar")
+    tasks = ((text, size, fmt, profile, options) for text in items)
+    return _ordered_results(executor, render, tasks, 2 * workers)
+
+
+def generate_many_processes(items: Iterable[str],
+                            size: int = _DEFAULT_IMAGE_SIZE,
+                            fmt: SupportedImageFmt
+                            | str = SupportedImageFmt.PNG,
+                            workers: int | None = None,
+                            profile: EncodeProfile | str | None = None,
+                            chunksize: int = 64,
+                            warm: str = DEFAULT_WARMUP_CHARACTERS,
+                            **options: Any) -> Iterator[bytes]:
+    """Generate encoded avatars for many input strings, using a pool of
+    processes.
+
+    Meant for very large offline jobs. Each worker process loads its font
+    and rasterizes the `warm` characters once when it starts, then receives
+    the input texts in chunks and sends back the encoded avatars. Results
+    are yielded in the order of `items`, which are consumed lazily: at most
+    twice as many chunks as workers are being generated at any time.
+
+    Fonts registered with `register_font` are sent to the workers, so they
+    also work with the "spawn" and "forkserver" start methods.
+
+    :param items: Input texts to use in the avatars.
+    :param size: (optional) Integer, size in pixel of the avatars.
+    :param fmt: (optional) Avatars file format.
+    :param workers: (optional) Number of processes, the CPU count if unset.
+    :param profile: (optional) Encode profile, the default one if unset.
+    :param chunksize: (optional) Number of avatars sent to a worker at once.
+    :param warm: (optional) Characters rasterized when a worker starts.
+    :param options: (optional) Any other `PyAvatar` parameter, such as
+                    `fontpath` or `deterministic`. They must be picklable.
+    :rtype: iterator of bytes
+
+    Usage::
+      >>> from pyavatar import generate_many_processes
+      >>> for data in generate_many_processes(usernames, deterministic=True):
+      ...     upload(data)
+    """
+    if chunksize < 1:
+        raise ValueError("Argument `chunksize` must be a positive integer.")
+    fmt = image_format(fmt)
+    profile = encode_profile(profile)
+    # Fail early on invalid options, and resolve registered font names
+    fontpath = PyAvatar("a", size=size, **options).fontpath
+    options = dict(options, fontpath=fontpath)
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(size, fmt, profile, options, warm, font_data(fontpath)))
+    tasks = ((chunk, ) for chunk in _chunks(items, chunksize))
+    return _flatten(
+        _ordered_results(executor, _render_chunk, tasks, 2 * workers))
+
+
+_WorkerJob: TypeAlias = tuple[int,
+                              SupportedImageFmt,
+                              EncodeProfile,
+                              dict[str, Any]]
+
+_worker_job: _WorkerJob | None = None
+
+
+def _init_worker(size: int,
+                 fmt: SupportedImageFmt,
+                 profile: EncodeProfile,
+                 options: dict[str, Any],
+                 warm: str,
+                 data: bytes | None) -> None:
+    global _worker_job
+    _worker_job = (size, fmt, profile, options)
+    random.seed()  # forked workers would share the parent random state
+    fontpath = options["fontpath"]
+    # Only forked workers inherit the fonts registered from memory
+    if data is not None and font_data(fontpath) is None:
+        register_font(fontpath, data)
+    warmup(warm, (size, ), (fontpath, ), freeze=False)
+
+
+def _render_chunk(texts: list[str]) -> list[bytes]:
+    assert _worker_job is not None
+    return [render(text, *_worker_job) for text in texts]
+
+
+def _flatten(results: Iterable[list[_T]]) -> Iterator[_T]:
+    for chunk in results:
+        yield from chunk
+
+
+def _chunks(items: Iterable[_T], size: int) -> Iterator[list[_T]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _ordered_results(executor: Executor,
+                     fn: Callable[..., _R],
+                     tasks: Iterable[tuple[Any, ...]],
+                     max_pending: int) -> Iterator[_R]:
+    """Submit tasks to an executor and yield their results in order, with
+    at most `max_pending` tasks submitted and not yet yielded."""
+    pending: deque[Future[_R]] = deque()
+    try:
+        for args in tasks:
+            pending.append(executor.submit(fn, *args))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,128 @@
+"""
+Bounded, thread-safe LRU cache shared by the pyavatar rendering caches.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, NamedTuple, TypeVar
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of a pyavatar cache.
+
+    ``maxsize`` and ``currsize`` are expressed in the cache unit, which is a
+    number of entries unless the cache weighs its values (e.g. in bytes).
+    """
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache(Generic[_K, _V]):
+    """Least recently used cache, bounded in entries or in total weight.
+
+    :param maxsize: Maximum number of entries, or maximum total weight when
+                    ``weigh`` is given. A size of 0 disables the cache.
+    :param weigh: (optional) Function returning the weight of a value.
+    """
+
+    def __init__(self,
+                 maxsize: int,
+                 weigh: Callable[[_V], int] | None = None) -> None:
+        if maxsize < 0:
+            raise ValueError("Cache `maxsize` must be a positive integer.")
+        self._maxsize = maxsize
+        self._weigh = weigh
+        self._data: OrderedDict[_K, tuple[_V, int]] = OrderedDict()
+        self._currsize = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: _K) -> bool:
+        return key in self._data
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    def get(self, key: _K) -> _V | None:
+        """Return the value cached under `key`, or None on a miss."""
+        with self._lock:
+            try:
+                value, _ = self._data[key]
+            except KeyError:
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: _K, value: _V) -> None:
+        """Cache `value` under `key`, evicting the least recently used
+        entries to stay within bounds."""
+        weight = self._weigh(value) if self._weigh else 1
+        with self._lock:
+            if weight > self._maxsize:
+                return
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._currsize -= previous[1]
+            self._data[key] = (value, weight)
+            self._currsize += weight
+            self._evict()
+
+    def get_or_create(self, key: _K, factory: Callable[[], _V]) -> _V:
+        """Return the value cached under `key`, creating it with `factory`
+        on a miss. The factory runs outside of the cache lock."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def resize(self, maxsize: int) -> None:
+        """Change the bound of the cache, evicting entries if needed."""
+        if maxsize < 0:
+            raise ValueError("Cache `maxsize` must be a positive integer.")
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def discard(self, predicate: Callable[[_K], bool]) -> None:
+        """Remove the entries whose key matches `predicate`, they are not
+        counted as evictions."""
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                _, weight = self._data.pop(key)
+                self._currsize -= weight
+
+    def clear(self) -> None:
+        """Remove every entry and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self._currsize = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits,
+                             self._misses,
+                             self._evictions,
+                             self._maxsize,
+                             self._currsize)
+
+    def _evict(self) -> None:
+        while self._currsize > self._maxsize:
+            _, (_, weight) = self._data.popitem(last=False)
+            self._currsize -= weight
+            self._evictions += 1
@@ -0,0 +1,196 @@
+"""
+Persistent, content-addressed cache of encoded avatars.
+
+The cache survives process restarts and can be shared by every process of
+a host. Entries are stored under a sharded directory layout, written
+atomically, and evicted by least recent access once the cache grows over
+its size cap.
+"""
+
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from ._cache import CacheInfo
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+# Total size of the entries, shared by every process using the cache.
+_SIZE = struct.Struct("<Q")
+_SIZE_FILE = ".size"
+
+
+class DiskCache:
+    """Cache encoded avatars in a directory.
+
+    Keys are hexadecimal digests, stored at ``<directory>/ab/cd/abcd...``.
+    Entries are written to a temporary file then renamed, so readers never
+    see partial entries, and the access time of an entry is refreshed on
+    every hit. Once the total size of the entries goes over `max_bytes`, the
+    least recently accessed ones are removed. The total is kept in a file
+    of the directory, locked by writers, so the cap holds across processes.
+
+    :param directory: Directory of the cache, created if needed.
+    :param max_bytes: (optional) Size cap of the cache, in bytes.
+
+    Usage::
+      >>> import pyavatar
+      >>> pyavatar.set_cache_backend(
+      ...     pyavatar.DiskCache("/var/cache/avatars", max_bytes=2**30))
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        if max_bytes < 0:
+            raise ValueError("Cache `max_bytes` must be a positive integer.")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:4], key)
+
+    def get(self, key: str) -> bytes | None:
+        """Return the entry stored under `key`, if any."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        except OSError:
+            with self._stats_lock:
+                self._misses += 1
+            return None
+        with self._stats_lock:
+            self._hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store `data` under `key`, errors are ignored."""
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                             prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                with self._size_lock() as size_fd:
+                    size = self._read_size(size_fd)
+                    try:
+                        size -= os.stat(path).st_size  # replaced entry
+                    except FileNotFoundError:
+                        pass
+                    os.replace(temp_path, path)
+                    size += len(data)
+                    if size > self.max_bytes:
+                        size = self._evict()
+                    _write_size(size_fd, size)
+            except BaseException:
+                _unlink(temp_path)
+                raise
+        except OSError:
+            return
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._size_lock() as size_fd:
+            for path, _ in self._entries():
+                _unlink(path)
+            _write_size(size_fd, 0)
+        with self._stats_lock:
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        """Return the statistics of the cache, sizes are in bytes. The size
+        is the one of the whole cache, the other statistics only count the
+        lookups and evictions of this instance."""
+        try:
+            with self._size_lock() as size_fd:
+                size = self._read_size(size_fd)
+        except OSError:  # no entry written yet
+            size = 0
+        with self._stats_lock:
+            return CacheInfo(self._hits,
+                             self._misses,
+                             self._evictions,
+                             self.max_bytes,
+                             size)
+
+    @contextmanager
+    def _size_lock(self) -> Iterator[int]:
+        """Lock the size file of the cache, and yield its descriptor."""
+        fd = os.open(os.path.join(self.directory, _SIZE_FILE),
+                     os.O_RDWR | os.O_CREAT,
+                     0o644)
+        try:
+            with self._lock:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)  # released on close
+                yield fd
+        finally:
+            os.close(fd)
+
+    def _read_size(self, fd: int) -> int:
+        os.lseek(fd, 0, os.SEEK_SET)
+        data = os.read(fd, _SIZE.size)
+        if len(data) < _SIZE.size:  # new cache
+            return self._measure()
+        size: int = _SIZE.unpack(data)[0]
+        return size
+
+    def _entries(self) -> list[tuple[str, os.stat_result]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith("."):  # temporary or size file
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    entries.append((path, os.stat(path)))
+                except OSError:  # removed by another process
+                    pass
+        return entries
+
+    def _measure(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _evict(self) -> int:
+        """Remove the least recently accessed entries until the cache fits
+        in 90% of its size cap, and return its new size."""
+        entries = sorted(self._entries(), key=lambda e: e[1].st_atime)
+        size = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * 9 // 10
+        evictions = 0
+        for path, stat in entries:
+            if size <= target:
+                break
+            _unlink(path)
+            size -= stat.st_size
+            evictions += 1
+        with self._stats_lock:
+            self._evictions += evictions
+        return size
+
+
+def _write_size(fd: int, size: int) -> None:
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.write(fd, _SIZE.pack(size))
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
@@ -0,0 +1,120 @@
+"""
+Process-wide cache of loaded FreeType fonts.
+
+Parsing a font file is the most expensive step of rendering an avatar, so
+fonts are loaded once per (fontpath, pixel size) and shared by every
+avatar of the process. Fonts registered from memory are loaded from a
+single in-memory copy of their data, shared by every size.
+"""
+
+import hashlib
+import os
+from io import BytesIO
+
+from PIL import ImageFont
+
+from . import _instrument
+from ._cache import CacheInfo, LRUCache
+
+_DEFAULT_FONT_CACHE_SIZE = 64
+
+_font_cache: LRUCache[tuple[str, int], ImageFont.FreeTypeFont] = LRUCache(
+    _DEFAULT_FONT_CACHE_SIZE)
+
+# Data of the fonts registered from memory, by name.
+_font_data: dict[str, bytes] = {}
+
+# Font paths already validated, trusted without any I/O until loading the
+# font fails.
+validated_fontpaths: LRUCache[str, bool] = LRUCache(_DEFAULT_FONT_CACHE_SIZE)
+
+
+def load_font(fontpath: str, size: int) -> ImageFont.FreeTypeFont:
+    """Load the font at `fontpath`, or registered from memory under this
+    name, for a given pixel size."""
+    data = _font_data.get(fontpath)
+    if data is None:
+        try:
+            return ImageFont.truetype(fontpath, size=size)
+        except OSError:
+            validated_fontpaths.discard(lambda key: key == fontpath)
+            raise
+    # Reading a whole BytesIO returns its initial bytes without copying
+    return ImageFont.truetype(BytesIO(data), size=size)
+
+
+def add_font_data(name: str, data: bytes) -> None:
+    """Register the data of a font file under a name."""
+    _font_data[name] = data
+
+
+def forget_font(fontpath: str) -> None:
+    """Drop the data, loaded sizes and digest of the font registered under
+    `fontpath`, before registering another font under it."""
+    _font_data.pop(fontpath, None)
+    _font_cache.discard(lambda key: key[0] == fontpath)
+    _font_digests.discard(lambda key: key[0] == fontpath)
+
+
+def font_data(name: str) -> bytes | None:
+    """Return the data of the font registered from memory under `name`, if
+    any."""
+    return _font_data.get(name)
+
+
+def get_font(fontpath: str, size: int) -> ImageFont.FreeTypeFont:
+    """Return the font at `fontpath` loaded for a given pixel size."""
+    if _instrument.enabled:
+        return _instrument.get_or_create(
+            "font",
+            _font_cache, (fontpath, size),
+            lambda: _instrument.stage("font_load", load_font, fontpath, size))
+    return _font_cache.get_or_create((fontpath, size),
+                                     lambda: load_font(fontpath, size))
+
+
+# Digests by font path, and inode and modification time of the font file.
+_font_digests: LRUCache[tuple[str, int, int],
+                        str] = LRUCache(_DEFAULT_FONT_CACHE_SIZE)
+
+
+def font_digest(fontpath: str) -> str:
+    """Return the SHA-256 digest of the font file at `fontpath`, or of the
+    font registered from memory under this name."""
+    data = _font_data.get(fontpath)
+    if data is not None:
+        return _font_digests.get_or_create(
+            (fontpath, 0, 0), lambda: hashlib.sha256(data).hexdigest())
+
+    def digest() -> str:
+        with open(fontpath, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    stat = os.stat(fontpath)
+    return _font_digests.get_or_create(
+        (fontpath, stat.st_ino, stat.st_mtime_ns), digest)
+
+
+def font_cache_info() -> CacheInfo:
+    """Return the statistics of the font cache.
+
+    Usage::
+      >>> import pyavatar
+      >>> pyavatar.font_cache_info()
+      CacheInfo(hits=4, misses=1, evictions=0, maxsize=64, currsize=1)
+    """
+    return _font_cache.info()
+
+
+def clear_font_cache() -> None:
+    """Drop every loaded font and reset the font cache statistics."""
+    _font_cache.clear()
+
+
+def set_font_cache_size(maxsize: int) -> None:
+    """Set the maximum number of fonts kept loaded, evicting the least
+    recently used ones if needed. A size of 0 disables the cache.
+
+    :param maxsize: Maximum number of (fontpath, size) entries.
+    """
+    _font_cache.resize(maxsize)
@@ -0,0 +1,111 @@
+"""
+Process-wide cache of rasterized glyphs.
+
+An avatar is a solid background with a single centered character. Each
+(character, fontpath, size) glyph is rasterized once into an alpha mask
+and avatars are composited from it, so repeated characters skip all the
+FreeType work (measurement and rasterization).
+"""
+
+from typing import NamedTuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from . import _instrument
+from ._cache import CacheInfo, LRUCache
+from ._fonts import get_font
+
+_DEFAULT_GLYPH_CACHE_SIZE = 1024
+
+
+class Glyph(NamedTuple):
+    """Coverage mask of a character, cropped to its ink box.
+
+    ``offset`` is the position of the mask within the avatar, centering
+    the character.
+    """
+    mask: Image.Image
+    offset: tuple[int, int]
+
+
+_glyph_cache: LRUCache[tuple[str, str, int],
+                       Glyph] = LRUCache(_DEFAULT_GLYPH_CACHE_SIZE)
+
+
+def font_size(size: int) -> int:
+    """Return the font pixel size used to render an avatar of `size`."""
+    return int(0.6 * size)
+
+
+def get_glyph(char: str, fontpath: str, size: int) -> Glyph:
+    """Return the centered glyph of `char` for an avatar of `size`."""
+    if _instrument.enabled:
+        return _instrument.get_or_create(
+            "glyph",
+            _glyph_cache, (char, fontpath, size),
+            lambda: _rasterize(char, fontpath, size))
+    return _glyph_cache.get_or_create((char, fontpath, size),
+                                      lambda: _rasterize(char, fontpath, size))
+
+
+def _rasterize(char: str, fontpath: str, size: int) -> Glyph:
+    font = get_font(fontpath, font_size(size))
+    mask = Image.new(mode="L", size=(size, size), color=0)
+    draw = ImageDraw.Draw(mask)
+    position = _instrument.stage("measure", _center, draw, char, font, size)
+    _instrument.stage("rasterize",
+                      draw.text,
+                      position,
+                      char,
+                      fill=255,
+                      font=font)
+    box = mask.getbbox() or (0, 0, 1, 1)  # blank characters have no ink
+    return Glyph(mask.crop(box), (box[0], box[1]))
+
+
+def _center(draw: ImageDraw.ImageDraw,
+            char: str,
+            font: ImageFont.FreeTypeFont,
+            size: int) -> tuple[float, float]:
+    """Return the position to draw `char` at, to center its ink box."""
+    _, _, w_txt, h_txt = draw.textbbox((0, 0), char, font)
+    off_x, off_y, _, _ = font.getbbox(char)
+    return ((size / 2 - (w_txt + off_x) / 2), (size / 2 - (h_txt + off_y) / 2))
+
+
+def downsample(glyph: Glyph, size: int, factor: int) -> Glyph:
+    """Return the glyph for an avatar of `size`, reduced from `glyph`
+    rasterized for an avatar `factor` times larger.
+
+    Averaging blocks of pixels of a larger glyph anti-aliases as well as
+    FreeType, and is many times faster than rasterizing the glyph again.
+    """
+    mask = Image.new(mode="L", size=(size * factor, size * factor), color=0)
+    mask.paste(glyph.mask, glyph.offset)
+    mask = mask.reduce(factor)
+    box = mask.getbbox() or (0, 0, 1, 1)
+    return Glyph(mask.crop(box), (box[0], box[1]))
+
+
+def forget_glyphs(fontpath: str) -> None:
+    """Drop the glyphs rasterized with the font at `fontpath`."""
+    _glyph_cache.discard(lambda key: key[1] == fontpath)
+
+
+def glyph_cache_info() -> CacheInfo:
+    """Return the statistics of the glyph cache."""
+    return _glyph_cache.info()
+
+
+def clear_glyph_cache() -> None:
+    """Drop every rasterized glyph and reset the glyph cache statistics."""
+    _glyph_cache.clear()
+
+
+def set_glyph_cache_size(maxsize: int) -> None:
+    """Set the maximum number of rasterized glyphs kept in memory, evicting
+    the least recently used ones if needed. A size of 0 disables the cache.
+
+    :param maxsize: Maximum number of (character, fontpath, size) entries.
+    """
+    _glyph_cache.resize(maxsize)
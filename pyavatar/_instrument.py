@@ -0,0 +1,210 @@
+"""
+Opt-in instrumentation of avatar renders.
+
+Each render (a call to `stream`, `save` or `base64_image`, or a first
+access to `image`) can be described by a `RenderStats`: the time spent in
+each stage, the cache hits and misses, and the size of the output. Stats
+are only gathered while a hook is registered or renders are collected;
+otherwise the rendering code only checks the `enabled` flag.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Hashable, Iterator, TypeVar
+
+from ._cache import LRUCache
+
+_T = TypeVar("_T")
+_K = TypeVar("_K", bound=Hashable)
+
+
+class RenderStats:
+    """Statistics of a render.
+
+    ``durations`` maps the stages that ran to their duration in seconds:
+    ``font_load``, ``measure`` (text bounding box), ``rasterize``
+    (drawing the glyph), ``composite`` (the glyph over the background) and
+    ``encode``. ``hits`` and ``misses`` count the lookups of each cache:
+    ``font``, ``glyph``, ``output`` and ``backend``.
+    """
+    __slots__ = ("text",
+                 "size",
+                 "format",
+                 "profile",
+                 "duration",
+                 "durations",
+                 "hits",
+                 "misses",
+                 "bytes")
+
+    def __init__(self,
+                 text: str,
+                 size: int,
+                 format: str | None,
+                 profile: str | None) -> None:
+        self.text = text
+        self.size = size
+        # Format and encode profile, None for a render without encoding
+        self.format = format
+        self.profile = profile
+        # Duration of the whole render, in seconds
+        self.duration = 0.0
+        self.durations: dict[str, float] = {}
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+        # Size of the output
+        self.bytes = 0
+
+    def __repr__(self) -> str:
+        return (f"RenderStats(text={self.text!r}, size={self.size}, "
+                f"format={self.format!r}, duration={self.duration:.6f}, "
+                f"durations={self.durations}, hits={self.hits}, "
+                f"misses={self.misses}, bytes={self.bytes})")
+
+
+# Checked by the rendering code before gathering any statistics.
+enabled = False
+
+_lock = threading.Lock()
+_hooks: list[Callable[[RenderStats], None]] = []
+_logger = logging.getLogger("pyavatar")
+_collecting = 0
+_collector: ContextVar[list[RenderStats] | None] = ContextVar(
+    "pyavatar_collector", default=None)
+_current: ContextVar[RenderStats | None] = ContextVar("pyavatar_render",
+                                                      default=None)
+
+
+def _update() -> None:
+    global enabled
+    enabled = bool(_hooks) or _collecting > 0
+
+
+def add_render_hook(hook: Callable[[RenderStats], None]) -> None:
+    """Call `hook` with the statistics of every render of the process,
+    from the thread which rendered. Errors raised by the hook are logged to
+    the ``pyavatar`` logger, they do not fail the render.
+
+    :param hook: Function receiving a `RenderStats`.
+
+    Usage::
+      >>> import pyavatar
+      >>> pyavatar.add_render_hook(lambda stats: log.info("%r", stats))
+    """
+    with _lock:
+        _hooks.append(hook)
+        _update()
+
+
+def remove_render_hook(hook: Callable[[RenderStats], None]) -> None:
+    """Stop calling a hook added with `add_render_hook`."""
+    with _lock:
+        _hooks.remove(hook)
+        _update()
+
+
+@contextmanager
+def collect_renders() -> Iterator[list[RenderStats]]:
+    """Collect the statistics of the renders of the current thread or
+    asyncio task, within the block.
+
+    Renders offloaded to executors, such as by `generate_many` or
+    `render_async`, only reach hooks.
+
+    Usage::
+      >>> import pyavatar
+      >>> with pyavatar.collect_renders() as renders:
+      ...     pyavatar.PyAvatar("smallwat3r").stream("png")
+      >>> renders[0].durations
+      {'font_load': 0.00061, 'measure': 4e-05, 'rasterize': 9e-05, ...}
+    """
+    global _collecting
+    renders: list[RenderStats] = []
+    token = _collector.set(renders)
+    with _lock:
+        _collecting += 1
+        _update()
+    try:
+        yield renders
+    finally:
+        _collector.reset(token)
+        with _lock:
+            _collecting -= 1
+            _update()
+
+
+def observe(text: str,
+            size: int,
+            format: str | None,
+            profile: str | None,
+            render: Callable[[], _T]) -> _T:
+    """Call `render`, gathering its statistics, unless it is part of a
+    render already observed."""
+    if _current.get() is not None:
+        return render()
+    stats = RenderStats(text, size, format, profile)
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+        result = render()
+    finally:
+        stats.duration = time.perf_counter() - start
+        _current.reset(token)
+    if isinstance(result, bytes):
+        stats.bytes = len(result)
+    collector = _collector.get()
+    if collector is not None:
+        collector.append(stats)
+    for hook in list(_hooks):
+        try:
+            hook(stats)
+        except Exception:
+            _logger.exception("Render hook %r failed.", hook)
+    return result
+
+
+def stage(name: str, fn: Callable[..., _T], *args: object,
+          **kwargs: object) -> _T:
+    """Call `fn`, adding its duration to a stage of the current render.
+
+    For the slow paths of rendering only: fast paths check `enabled`
+    themselves, to skip this call.
+    """
+    if not enabled:
+        return fn(*args, **kwargs)
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.durations[name] = (stats.durations.get(name, 0.0) +
+                                     time.perf_counter() - start)
+
+
+def lookup(cache: str, hit: bool) -> None:
+    """Count a lookup of a cache in the current render."""
+    stats = _current.get()
+    if stats is not None:
+        counts = stats.hits if hit else stats.misses
+        counts[cache] = counts.get(cache, 0) + 1
+
+
+def get_or_create(name: str,
+                  cache: LRUCache[_K, _T],
+                  key: _K,
+                  create: Callable[[], _T]) -> _T:
+    """`cache.get_or_create`, counting the lookup in the current render."""
+    missed = False
+
+    def counted_create() -> _T:
+        nonlocal missed
+        missed = True
+        return create()
+
+    value = cache.get_or_create(key, counted_create)
+    lookup(name, hit=not missed)
+    return value
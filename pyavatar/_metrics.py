@@ -0,0 +1,287 @@
+"""
+Metrics of renders and caches, in the Prometheus text exposition format.
+
+Render metrics are fed by a render hook, once enabled. Cache metrics are
+read from the cache statistics when the metrics are rendered. Serving them
+is left to the host application, e.g. from a `/metrics` view.
+"""
+
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Iterator
+
+from ._cache import CacheInfo
+from ._fonts import font_cache_info
+from ._glyphs import glyph_cache_info
+from ._instrument import RenderStats, add_render_hook, remove_render_hook
+from ._output import cache_backend_info, output_cache_info
+
+# Content type of the text exposition format, to serve the metrics with
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_DURATION_BUCKETS = (0.0005,
+                     0.001,
+                     0.0025,
+                     0.005,
+                     0.01,
+                     0.025,
+                     0.05,
+                     0.1,
+                     0.25,
+                     0.5,
+                     1.0)
+
+_Labels = tuple[str, ...]
+_Sample = tuple[str, dict[str, str], float]
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _labels(self, values: _Labels) -> dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    @abstractmethod
+    def samples(self) -> Iterator[_Sample]:
+        """Yield the name, labels and value of every sample."""
+
+
+class Counter(_Metric):
+    """Monotonically increasing value, per set of label values."""
+    kind = "counter"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[_Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[_Sample]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield self.name, self._labels(labels), value
+
+
+class Gauge(Counter):
+    """Value that can go up and down, per set of label values."""
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, per set of
+    label values."""
+    kind = "histogram"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = _DURATION_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets + (math.inf, )
+        # Per bucket counts, then sum of the values
+        self._values: dict[_Labels, tuple[list[int], float]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        with self._lock:
+            counts, total = self._values.get(labels,
+                                             ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[labels] = (counts, total + value)
+
+    def samples(self) -> Iterator[_Sample]:
+        with self._lock:
+            values = sorted(
+                (labels, (list(counts), total))
+                for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (f"{self.name}_bucket",
+                       dict(self._labels(labels), le=_format(bound)),
+                       cumulative)
+            yield f"{self.name}_sum", self._labels(labels), total
+            yield f"{self.name}_count", self._labels(labels), cumulative
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together.
+
+    Collectors are called each time the metrics are rendered, to build
+    metrics read from elsewhere, such as cache statistics.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], Iterable[_Metric]]] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[],
+                                                Iterable[_Metric]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Return every metric, in the Prometheus text exposition format."""
+        metrics = list(self._metrics)
+        for collector in self._collectors:
+            metrics.extend(collector())
+        lines = []
+        for metric in metrics:
+            lines.append(
+                f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    pairs = ",".join(f'{key}="{_escape(value, quote=True)}"'
+                                     for key, value in labels.items())
+                    name = f"{name}{{{pairs}}}"
+                lines.append(f"{name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str, quote: bool = False) -> str:
+    value = value.replace("\\", r"\\").replace("\n", r"\n")
+    return value.replace('"', r'\"') if quote else value
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+_registry = MetricsRegistry()
+
+_renders = Counter(
+    "pyavatar_renders_total",
+    "Avatars requested, by format, encode profile and result: rendered, or "
+    "hit in a cache of encoded avatars.", ("format", "profile", "result"))
+_render_duration = Histogram("pyavatar_render_duration_seconds",
+                             "Duration of renders, by format and result.",
+                             ("format", "result"))
+_stage_duration = Histogram("pyavatar_stage_duration_seconds",
+                            "Duration of the stages of renders, by stage.",
+                            ("stage", ))
+_output_bytes = Counter("pyavatar_output_bytes_total",
+                        "Size of the encoded avatars, by format.",
+                        ("format", ))
+_backend_lookups = Counter("pyavatar_backend_lookups_total",
+                           "Lookups of the cache backend, by result.",
+                           ("result", ))
+for _metric in (_renders,
+                _render_duration,
+                _stage_duration,
+                _output_bytes,
+                _backend_lookups):
+    _registry.register(_metric)
+
+
+def _caches() -> Iterator[_Metric]:
+    caches: dict[str, CacheInfo] = {
+        "font": font_cache_info(),
+        "glyph": glyph_cache_info(),
+        "output": output_cache_info(),
+    }
+    backend = cache_backend_info()
+    if backend is not None:
+        caches["backend"] = backend
+    hits = Counter("pyavatar_cache_hits_total", "Cache hits.", ("cache", ))
+    misses = Counter("pyavatar_cache_misses_total",
+                     "Cache misses.", ("cache", ))
+    evictions = Counter("pyavatar_cache_evictions_total",
+                        "Cache evictions.", ("cache", ))
+    size = Gauge(
+        "pyavatar_cache_size",
+        "Size of the cache, in entries, or in bytes for the output cache "
+        "and the cache backend.", ("cache", ))
+    max_size = Gauge("pyavatar_cache_max_size",
+                     "Maximum size of the cache, 0 if disabled.", ("cache", ))
+    for name, info in caches.items():
+        hits.inc(name, amount=info.hits)
+        misses.inc(name, amount=info.misses)
+        evictions.inc(name, amount=info.evictions)
+        size.set(name, value=info.currsize)
+        max_size.set(name, value=info.maxsize)
+    return iter((hits, misses, evictions, size, max_size))
+
+
+_registry.add_collector(_caches)
+
+
+def _record(stats: RenderStats) -> None:
+    fmt = stats.format or "raw"
+    # Encoded avatars served from the output cache or backend skip encoding
+    rendered = stats.format is None or "encode" in stats.durations
+    result = "render" if rendered else "hit"
+    _renders.inc(fmt, stats.profile or "", result)
+    _render_duration.observe(fmt, result, value=stats.duration)
+    for stage, duration in stats.durations.items():
+        _stage_duration.observe(stage, value=duration)
+    if stats.bytes:
+        _output_bytes.inc(fmt, amount=stats.bytes)
+    for result, counts in (("hit", stats.hits), ("miss", stats.misses)):
+        if "backend" in counts:
+            _backend_lookups.inc(result, amount=counts["backend"])
+
+
+def enable_metrics() -> None:
+    """Start feeding the render metrics, cache metrics are always
+    available.
+
+    Renders of the workers of `generate_many_processes` are not counted.
+
+    Usage::
+      >>> import pyavatar
+      >>> pyavatar.enable_metrics()
+    """
+    disable_metrics()
+    add_render_hook(_record)
+
+
+def disable_metrics() -> None:
+    """Stop feeding the render metrics, their values are kept."""
+    try:
+        remove_render_hook(_record)
+    except ValueError:  # not enabled
+        pass
+
+
+def render_metrics() -> str:
+    """Return the metrics of pyavatar in the Prometheus text exposition
+    format, to be served with the `METRICS_CONTENT_TYPE` content type.
+
+    Usage::
+      >>> import pyavatar
+      >>> print(pyavatar.render_metrics())
+      # HELP pyavatar_renders_total Avatars requested, by format, ...
+      # TYPE pyavatar_renders_total counter
+      pyavatar_renders_total{format="png",profile="balanced",result="hit"} 42.0
+      ...
+    """
+    return _registry.render()
@@ -0,0 +1,137 @@
+"""
+Encoding of avatars, and process-wide cache of encoded avatars.
+
+Identical avatars (same character, size, color, font and format) encode
+to identical bytes, so the encoded output can be shared across instances.
+The cache is bounded by the total size in bytes of the outputs it holds,
+and is disabled by default.
+"""
+
+from io import BytesIO
+from typing import Any, Hashable, Protocol
+
+from PIL import Image
+
+from . import _instrument
+from ._cache import CacheInfo, LRUCache
+from ._glyphs import Glyph
+
+OutputKey = tuple[Hashable, ...]
+
+_output_cache: LRUCache[OutputKey, bytes] = LRUCache(0, weigh=len)
+
+
+class CacheBackend(Protocol):
+    """Storage of encoded avatars shared beyond the process, such as
+    `DiskCache`. Keys are hexadecimal digests of the avatar content.
+
+    Backends can also implement ``info() -> CacheInfo``, whose statistics
+    are then exported by the cache metrics.
+    """
+
+    def get(self, key: str) -> bytes | None:
+        ...
+
+    def put(self, key: str, data: bytes) -> None:
+        ...
+
+
+_cache_backend: CacheBackend | None = None
+
+
+def encode(image: Image.Image, fmt: str, options: dict[str, Any]) -> bytes:
+    """Encode an image in a given format, with Pillow save options."""
+    stream = BytesIO()
+    image.save(stream, format=fmt, **options)
+    return stream.getvalue()
+
+
+def palette_image(glyph: Glyph,
+                  size: int,
+                  background: tuple[int, ...],
+                  foreground: tuple[int, ...],
+                  levels: int) -> Image.Image:
+    """Build a palette image of an avatar straight from its glyph mask.
+
+    The palette is a gradient of `levels` colors from the background to the
+    foreground color, and mask coverage values map to palette indices. With
+    256 levels the image has the same pixels as the composited avatar.
+    """
+    lut = [round(value * (levels - 1) / 255) for value in range(256)]
+    palette: list[int] = []
+    for index in range(levels):
+        alpha = round(index * 255 / (levels - 1))
+        palette.extend((bg * (255 - alpha) + fg * alpha + 127) // 255
+                       for bg, fg in zip(background[:3], foreground[:3]))
+    image = Image.new(mode="L", size=(size, size), color=0)
+    image.paste(glyph.mask.point(lut), glyph.offset)
+    image.putpalette(palette)
+    return image
+
+
+def palette_bits(levels: int) -> int:
+    """Return the PNG bit depth needed to store `levels` palette indices."""
+    return next(bits for bits in (1, 2, 4, 8) if levels <= 1 << bits)
+
+
+def get_output(key: OutputKey) -> bytes | None:
+    """Return the encoded avatar cached under `key`, if any."""
+    if not _output_cache.maxsize:
+        return None
+    data = _output_cache.get(key)
+    if _instrument.enabled:
+        _instrument.lookup("output", hit=data is not None)
+    return data
+
+
+def put_output(key: OutputKey, data: bytes) -> None:
+    """Cache an encoded avatar under `key`."""
+    if _output_cache.maxsize:
+        _output_cache.put(key, data)
+
+
+def forget_outputs(fontpath: str) -> None:
+    """Drop the outputs of avatars drawn with the font at `fontpath`."""
+    _output_cache.discard(lambda key: key[3] == fontpath)
+
+
+def output_cache_info() -> CacheInfo:
+    """Return the statistics of the output cache, sizes are in bytes."""
+    return _output_cache.info()
+
+
+def clear_output_cache() -> None:
+    """Drop every encoded avatar and reset the output cache statistics."""
+    _output_cache.clear()
+
+
+def set_output_cache_size(maxsize: int) -> None:
+    """Set the maximum total size in bytes of the encoded avatars kept in
+    memory, evicting the least recently used ones if needed. A size of 0
+    disables the cache.
+
+    :param maxsize: Maximum size of the cache, in bytes.
+    """
+    _output_cache.resize(maxsize)
+
+
+def get_cache_backend() -> CacheBackend | None:
+    """Return the cache backend in use, if any."""
+    return _cache_backend
+
+
+def cache_backend_info() -> CacheInfo | None:
+    """Return the statistics of the cache backend in use, if it reports
+    any, sizes are in bytes."""
+    info = getattr(_cache_backend, "info", None)
+    return info() if info is not None else None
+
+
+def set_cache_backend(backend: CacheBackend | None) -> None:
+    """Set the cache backend checked before rendering an avatar, after the
+    in-process caches. None disables it.
+
+    :param backend: Cache backend, such as `DiskCache`.
+    """
+    global _cache_backend
+    _cache_backend = backend
@@ -0,0 +1,274 @@
+"""
+Cache of encoded avatars in shared memory.
+
+Pre-forked worker processes (e.g. gunicorn workers) each keep their own
+copy of the in-process caches. This cache lives instead in a memory-mapped
+file, typically under /dev/shm, which every process of a host maps: an
+avatar encoded by one worker can be read by all of them.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Iterator, TypeVar
+
+from ._cache import CacheInfo
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+# File header: magic, number of slots, size of a slot.
+_FILE_HEADER = struct.Struct("<8sII")
+# Slot header: sequence number, write timestamp, key digest, data length.
+_SLOT_HEADER = struct.Struct("<IQ32sI")
+_SEQUENCE = struct.Struct("<I")
+# Slot header after the sequence number.
+_SLOT_FIELDS = struct.Struct("<Q32sI")
+_MAGIC = b"PYAVSHM1"
+# Digest of the free slots.
+_EMPTY = bytes(32)
+_PROBES = 8
+
+_T = TypeVar("_T")
+
+
+class SharedMemoryCache:
+    """Cache encoded avatars in a fixed-size table of slots, in a
+    memory-mapped file shared by every process opening it.
+
+    A key hashes to a few candidate slots. A slot holds a single entry, and
+    writing an entry replaces the matching or least recently written
+    candidate. Entries larger than a slot are not cached. Writers lock the
+    file, and readers check a per-slot sequence number instead of locking,
+    so that they never return an entry being overwritten.
+
+    Processes must open the file with the same number and size of slots.
+    A cache opened before forking can be used by the forked processes, each
+    reopens the file to take its own lock.
+
+    :param path: Path of the cache file, created if needed.
+    :param slots: (optional) Number of slots of the table.
+    :param slot_size: (optional) Size of a slot in bytes, including a
+                      48 bytes header.
+
+    Usage::
+      >>> import pyavatar
+      >>> pyavatar.set_cache_backend(
+      ...     pyavatar.SharedMemoryCache("/dev/shm/pyavatar", slots=8192))
+    """
+
+    def __init__(self,
+                 path: str,
+                 slots: int = 4096,
+                 slot_size: int = 16 * 1024) -> None:
+        if slots < 1:
+            raise ValueError("Cache `slots` must be a positive integer.")
+        if slot_size <= _SLOT_HEADER.size:
+            raise ValueError(
+                f"Cache `slot_size` must be over {_SLOT_HEADER.size} bytes.")
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+        size = _FILE_HEADER.size + slots * slot_size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with self._file_lock():
+                created = os.fstat(self._fd).st_size == 0
+                if created:
+                    os.ftruncate(self._fd, size)
+                elif os.fstat(self._fd).st_size != size:
+                    raise ValueError(f"Cache file {path} has another layout.")
+                self._mmap = mmap.mmap(self._fd, size)
+                header = (_MAGIC, slots, slot_size)
+                if created:
+                    _FILE_HEADER.pack_into(self._mmap, 0, *header)
+                elif _FILE_HEADER.unpack_from(self._mmap, 0) != header:
+                    self._mmap.close()
+                    raise ValueError(f"Cache file {path} has another layout.")
+        except BaseException:
+            os.close(self._fd)
+            raise
+        if fcntl is not None:
+            _reopen_at_fork(self)
+
+    def _reopen(self) -> None:
+        """Reopen the file in a forked child. `flock` locks belong to the
+        open file description, which the child shares with its parent."""
+        fd = os.open(self.path, os.O_RDWR)
+        os.close(self._fd)
+        self._fd = fd
+        self._lock = threading.Lock()  # could be held by another thread
+        self._stats_lock = threading.Lock()
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if fcntl is None:  # pragma: no cover
+            yield
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _offset(self, slot: int) -> int:
+        return _FILE_HEADER.size + slot * self.slot_size
+
+    def _candidates(self, digest: bytes) -> Iterator[int]:
+        start = int.from_bytes(digest[:8], "little") % self.slots
+        for probe in range(min(_PROBES, self.slots)):
+            yield self._offset((start + probe) % self.slots)
+
+    def _find(self, key: str) -> tuple[int, int, int] | None:
+        """Return the offset, sequence number and length of the entry of
+        `key`, if any."""
+        digest = _digest(key)
+        for offset in self._candidates(digest):
+            sequence, _, slot_digest, length = _SLOT_HEADER.unpack_from(
+                self._mmap, offset)
+            if not sequence & 1 and slot_digest == digest:
+                return offset, sequence, length
+        return None
+
+    def _unchanged(self, offset: int, sequence: int) -> bool:
+        current: int = _SEQUENCE.unpack_from(self._mmap, offset)[0]
+        return current == sequence
+
+    def get_view(self, key: str) -> memoryview | None:
+        """Return a view on the shared memory holding the entry of `key`,
+        without copying it, if any.
+
+        The view is only valid until the entry is overwritten, so it should
+        be used (e.g. written to a socket) right away.
+        """
+        found = self._find(key)
+        if found is None:
+            return self._count(None)
+        offset, sequence, length = found
+        start = offset + _SLOT_HEADER.size
+        view = memoryview(self._mmap)[start:start + length]
+        return self._count(view if self._unchanged(offset, sequence) else None)
+
+    def get(self, key: str) -> bytes | None:
+        """Return a copy of the entry of `key`, if any."""
+        found = self._find(key)
+        if found is None:
+            return self._count(None)
+        offset, sequence, length = found
+        start = offset + _SLOT_HEADER.size
+        data = self._mmap[start:start + length]
+        return self._count(data if self._unchanged(offset, sequence) else None)
+
+    def _count(self, entry: _T | None) -> _T | None:
+        """Count a lookup returning `entry`, and return it."""
+        with self._stats_lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return entry
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store `data` under `key`, unless it is larger than a slot."""
+        if len(data) > self.slot_size - _SLOT_HEADER.size:
+            return
+        digest = _digest(key)
+        with self._lock, self._file_lock():
+            offset = self._choose(digest)
+            _, _, slot_digest, _ = _SLOT_HEADER.unpack_from(self._mmap, offset)
+            if slot_digest not in (digest, _EMPTY):
+                with self._stats_lock:
+                    self._evictions += 1
+            sequence = _SEQUENCE.unpack_from(self._mmap, offset)[0]
+            _SEQUENCE.pack_into(self._mmap, offset, (sequence + 1) % 2**32)
+            start = offset + _SLOT_HEADER.size
+            self._mmap[start:start + len(data)] = data
+            self._commit(offset, sequence, time.time_ns(), digest, len(data))
+
+    def _commit(self,
+                offset: int,
+                sequence: int,
+                stamp: int,
+                digest: bytes,
+                length: int) -> None:
+        """Write the header of a slot marked as being written, `sequence`
+        being its number before that. The new even sequence number is
+        written last, so that readers never match it with the previous
+        digest or length."""
+        _SLOT_FIELDS.pack_into(self._mmap,
+                               offset + _SEQUENCE.size,
+                               stamp,
+                               digest,
+                               length)
+        _SEQUENCE.pack_into(self._mmap, offset, (sequence + 2) % 2**32)
+
+    def _choose(self, digest: bytes) -> int:
+        """Return the offset of the slot to write an entry to."""
+        chosen, oldest = 0, None
+        for offset in self._candidates(digest):
+            _, stamp, slot_digest, _ = _SLOT_HEADER.unpack_from(
+                self._mmap, offset)
+            if slot_digest == digest:
+                return offset
+            if oldest is None or stamp < oldest:
+                chosen, oldest = offset, stamp
+        return chosen
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock, self._file_lock():
+            for slot in range(self.slots):
+                offset = self._offset(slot)
+                sequence = _SEQUENCE.unpack_from(self._mmap, offset)[0]
+                _SEQUENCE.pack_into(self._mmap, offset, (sequence + 1) % 2**32)
+                self._commit(offset, sequence, 0, _EMPTY, 0)
+        with self._stats_lock:
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        """Return the statistics of the cache, sizes are in bytes of entry
+        data. The size is the one of the whole cache, the other statistics
+        only count the lookups and evictions of this instance."""
+        size = 0
+        for slot in range(self.slots):
+            sequence, _, slot_digest, length = _SLOT_HEADER.unpack_from(
+                self._mmap, self._offset(slot))
+            if not sequence & 1 and slot_digest != _EMPTY:
+                size += length
+        maxsize = self.slots * (self.slot_size - _SLOT_HEADER.size)
+        with self._stats_lock:
+            return CacheInfo(self._hits,
+                             self._misses,
+                             self._evictions,
+                             maxsize,
+                             size)
+
+    def close(self) -> None:
+        """Unmap the cache file, it is left on disk."""
+        self._mmap.close()
+        os.close(self._fd)
+
+
+def _reopen_at_fork(cache: SharedMemoryCache) -> None:
+    ref = weakref.ref(cache)
+
+    def reopen() -> None:
+        cache = ref()
+        if cache is not None and not cache._mmap.closed:
+            cache._reopen()
+
+    os.register_at_fork(after_in_child=reopen)
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=32).digest()
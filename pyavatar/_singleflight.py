@@ -0,0 +1,88 @@
+"""
+Coalescing of concurrent identical calls.
+
+When many callers ask for the same avatar at once, the first one renders
+it and the others wait for its result instead of duplicating the work.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+_R = TypeVar("_R")
+
+
+class SingleFlight(Generic[_R]):
+    """Coalesce concurrent calls sharing a key, across threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future[_R]] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], _R]) -> _R:
+        """Call `fn`, unless a call with the same key is in flight, in which
+        case wait for its result instead."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class _AsyncCall(Generic[_R]):
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future: "asyncio.Future[_R]") -> None:
+        self.future = future
+        self.waiters = 0
+
+
+class AsyncSingleFlight(Generic[_R]):
+    """Coalesce concurrent calls sharing a key, within an event loop.
+
+    The shared call is only cancelled once every caller waiting for it is,
+    callers arriving after that start a new call.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, _AsyncCall[_R]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[_R]]) -> _R:
+        """Await `fn()`, unless a call with the same key is in flight, in
+        which case wait for its result instead."""
+        call = self._calls.get(key)
+        if call is None or call.future.done():
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+            call.future.add_done_callback(lambda _: self._forget(key, call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.future)
+        except asyncio.CancelledError:
+            if not call.future.done() and call.waiters == 1:
+                call.future.cancel()
+                # The call may take a while to wind down, later callers
+                # start a new one rather than sharing its cancellation.
+                self._forget(key, call)
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _AsyncCall[_R]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
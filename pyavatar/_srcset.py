@@ -0,0 +1,49 @@
+"""
+Generation of an avatar at several sizes, e.g. for the 1x/2x/3x variants
+of a responsive image.
+"""
+
+from typing import Any, Iterable
+
+from ._avatar import EncodeProfile, PyAvatar, SupportedImageFmt, image_format
+
+
+def generate_srcset(text: str,
+                    sizes: Iterable[int],
+                    fmt: SupportedImageFmt | str = SupportedImageFmt.PNG,
+                    profile: EncodeProfile | str | None = None,
+                    **options: Any) -> dict[int, bytes]:
+    """Generate the same avatar at several sizes.
+
+    The text, color and font are parsed and validated once. The largest
+    size is rasterized, and the sizes it is an exact multiple of (e.g. the
+    1x of a 2x or 3x) are reduced from it, which is many times faster than
+    rasterizing them. Other sizes are rasterized directly.
+
+    :param text: Text of the avatar.
+    :param sizes: Sizes in pixel of the avatars.
+    :param fmt: (optional) Avatars file format.
+    :param profile: (optional) Encode profile, the default one if unset.
+    :param options: (optional) Any other `PyAvatar` parameter.
+    :rtype: dict
+
+    Usage::
+      >>> from pyavatar import generate_srcset
+      >>> images = generate_srcset("smallwat3r", (64, 128, 192), fmt="png")
+      >>> list(images)
+      [64, 128, 192]
+    """
+    fmt = image_format(fmt)
+    sizes = list(dict.fromkeys(sizes))
+    if not sizes:
+        raise ValueError("Argument `sizes` must not be empty.")
+    largest = max(sizes)
+    avatar = PyAvatar(text, size=largest, **options)
+    avatars = {}
+    for size in sizes:
+        exact = isinstance(size, int) and size > 0 and not largest % size
+        avatars[size] = avatar._resized(size, largest // size if exact else 1)
+    return {
+        size: avatar.stream(fmt, profile)
+        for size, avatar in avatars.items()
+    }
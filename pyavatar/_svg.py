@@ -0,0 +1,141 @@
+"""
+SVG rendering of avatars, without any rasterization.
+
+An SVG avatar is a background rectangle and its character. When fontTools
+is installed (``pip install pyavatar[svg]``), the character is embedded as
+the outline of its glyph, extracted once per (character, font), so that it
+renders the same everywhere. Otherwise it is a text element, drawn by the
+client with the font family of the avatar font if available.
+"""
+
+import re
+import threading
+from io import BytesIO
+from typing import NamedTuple
+from xml.sax.saxutils import escape, quoteattr
+
+from ._cache import LRUCache
+from ._fonts import font_data, get_font
+from ._glyphs import font_size
+
+try:
+    from fontTools.pens.boundsPen import BoundsPen
+    from fontTools.pens.svgPathPen import SVGPathPen
+    from fontTools.ttLib import TTFont
+except ImportError:  # pragma: no cover
+    TTFont = None
+
+_DEFAULT_OUTLINE_CACHE_SIZE = 1024
+
+# Characters XML 1.0 does not allow in a document, even escaped.
+_INVALID_XML_CHARS = re.compile(
+    "[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+class Outline(NamedTuple):
+    """SVG path of a glyph, and its ink box, in font units."""
+    path: str
+    bounds: tuple[float, float, float, float]
+    units_per_em: int
+
+
+class _Font(NamedTuple):
+    """Font parsed by fontTools. Its tables are read lazily from a shared
+    file object, so it must only be used holding its lock."""
+    font: "TTFont"
+    lock: threading.Lock
+
+
+_fonts: LRUCache[str, _Font] = LRUCache(16)
+_outlines: LRUCache[tuple[str, str],
+                    Outline | None] = LRUCache(_DEFAULT_OUTLINE_CACHE_SIZE)
+
+
+def outlines_available() -> bool:
+    """Return whether glyph outlines can be embedded in SVG avatars."""
+    return TTFont is not None
+
+
+def _load(fontpath: str) -> _Font:
+    data = font_data(fontpath)
+    if data is None:
+        return _Font(TTFont(fontpath, lazy=True), threading.Lock())
+    return _Font(TTFont(BytesIO(data), lazy=True), threading.Lock())
+
+
+def get_outline(char: str, fontpath: str) -> Outline | None:
+    """Return the outline of `char` in the font at `fontpath`, or None if
+    the font has no glyph for it."""
+
+    def extract() -> Outline | None:
+        font, lock = _fonts.get_or_create(fontpath, lambda: _load(fontpath))
+        with lock:
+            name = font.getBestCmap().get(ord(char))
+            if name is None:
+                return None
+            glyphs = font.getGlyphSet()
+            path_pen, bounds_pen = SVGPathPen(glyphs), BoundsPen(glyphs)
+            glyphs[name].draw(path_pen)
+            glyphs[name].draw(bounds_pen)
+            units_per_em = font["head"].unitsPerEm
+        bounds = bounds_pen.bounds or (0, 0, 0, 0)  # blank characters
+        return Outline(path_pen.getCommands(), bounds, units_per_em)
+
+    return _outlines.get_or_create((char, fontpath), extract)
+
+
+def forget_outlines(fontpath: str) -> None:
+    """Drop the outlines extracted from the font at `fontpath`."""
+    _fonts.discard(lambda key: key == fontpath)
+    _outlines.discard(lambda key: key[1] == fontpath)
+
+
+def _hex(color: tuple[int, ...]) -> str:
+    return "#{:02x}{:02x}{:02x}".format(*color[:3])
+
+
+def _number(value: float) -> str:
+    return f"{value:.4f}".rstrip("0").rstrip(".")
+
+
+def _xml_text(value: str) -> str:
+    """Replace the characters not allowed in XML by U+FFFD."""
+    return _INVALID_XML_CHARS.sub("\ufffd", value)
+
+
+def svg_image(char: str,
+              fontpath: str,
+              size: int,
+              background: tuple[int, ...],
+              foreground: tuple[int, ...]) -> bytes:
+    """Return the SVG document of an avatar.
+
+    As in raster avatars, the ink box of the character is centered.
+    """
+    outline = get_outline(char, fontpath) if outlines_available() else None
+    if outline is not None:
+        x_min, y_min, x_max, y_max = outline.bounds
+        scale = font_size(size) / outline.units_per_em
+        # Flip the y axis of the font, and center the ink box
+        matrix = (scale,
+                  0,
+                  0,
+                  -scale,
+                  size / 2 - scale * (x_min + x_max) / 2,
+                  size / 2 + scale * (y_min + y_max) / 2)
+        element = (f'<path transform="matrix('
+                   f'{" ".join(_number(value) for value in matrix)})" '
+                   f'fill="{_hex(foreground)}" d="{outline.path}"/>')
+    else:
+        family = get_font(fontpath, font_size(size)).getname()[0] or ""
+        family, text = _xml_text(family), _xml_text(char)
+        element = (f'<text x="50%" y="50%" text-anchor="middle" '
+                   f'dominant-baseline="central" '
+                   f'font-family={quoteattr(f"{family}, sans-serif")} '
+                   f'font-size="{font_size(size)}" '
+                   f'fill="{_hex(foreground)}">{escape(text)}</text>')
+    svg = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" '
+           f'height="{size}" viewBox="0 0 {size} {size}">'
+           f'<rect width="{size}" height="{size}" fill="{_hex(background)}"/>'
+           f'{element}</svg>')
+    return svg.encode("utf-8")
@@ -0,0 +1,52 @@
+"""
+Warm-up of the process caches before forking worker processes.
+"""
+
+import gc
+import string
+from typing import Iterable
+
+from ._avatar import (_DEFAULT_FONT_FILEPATH,
+                      _DEFAULT_IMAGE_SIZE,
+                      _validate_fontpath)
+from ._glyphs import get_glyph
+
+DEFAULT_WARMUP_CHARACTERS = string.ascii_uppercase + string.digits
+
+
+def warmup(chars: Iterable[str] = DEFAULT_WARMUP_CHARACTERS,
+           sizes: Iterable[int] = (_DEFAULT_IMAGE_SIZE, ),
+           fonts: Iterable[str] = (_DEFAULT_FONT_FILEPATH, ),
+           freeze: bool = True) -> None:
+    """Load fonts and rasterize glyphs ahead of the first avatars.
+
+    Meant to be called in the master process of a pre-forking server (e.g.
+    in a gunicorn `on_starting` hook): the loaded fonts, glyph masks and
+    centering metrics are then shared copy-on-write by the forked workers,
+    instead of each worker paying their cold-start cost. The font and glyph
+    caches must be large enough to hold them.
+
+    :param chars: (optional) Characters to rasterize, uppercase letters and
+                  digits by default.
+    :param sizes: (optional) Sizes in pixel of the avatars.
+    :param fonts: (optional) Filepaths of the fonts to load, or names of
+                  registered fonts.
+    :param freeze: (optional) Boolean, move every object tracked by the
+                   garbage collector to its permanent generation with
+                   `gc.freeze()`, so that collections in the workers do
+                   not write to the pages holding them.
+    :type freeze: bool
+
+    Usage::
+      >>> import pyavatar
+      >>> pyavatar.warmup(sizes=(64, 128, 256))
+    """
+    sizes = tuple(sizes)
+    chars = tuple(chars)
+    # Avatars look glyphs up by resolved font path
+    for fontpath in [_validate_fontpath(font) for font in fonts]:
+        for size in sizes:
+            for char in chars:
+                get_glyph(char, fontpath, size)
+    if freeze:
+        gc.freeze()
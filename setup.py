@@ -26,6 +26,7 @@ setup(name="pyavatar",
       include_package_data=True,
       packages=find_packages(),
       install_requires=install_requires,
+      extras_require={"svg": ["fonttools"]},
       classifiers=[
           "Programming Language :: Python :: 3",
           "Programming Language :: Python :: 3.10",
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyavatar import (ImageExtensionNotSupportedError,
+                      PyAvatar,
+                      base64_image_async,
+                      configure_async,
+                      render_async)
+
+
+def test_render_async() -> None:
+
+    async def main() -> tuple[bytes, str]:
+        return await asyncio.gather(
+            render_async("smallwat3r", size=80, deterministic=True),
+            base64_image_async("smallwat3r", fmt="jpeg", deterministic=True))
+
+    data, image = asyncio.run(main())
+    avatar = PyAvatar("smallwat3r", size=80, deterministic=True)
+    assert data == avatar.stream()
+    assert image == PyAvatar("smallwat3r",
+                             deterministic=True).base64_image("jpeg")
+
+    with pytest.raises(ImageExtensionNotSupportedError):
+        asyncio.run(render_async("smallwat3r", fmt="nope"))
+
+
+def test_render_async_backpressure_and_cancellation(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    release = threading.Event()
+    started = []
+
+    def blocking_stream(avatar, *args):
+        started.append(avatar.text)
+        release.wait()
+        return b""
+
+    async def main() -> None:
+        tasks = [asyncio.create_task(render_async(str(i))) for i in range(5)]
+        await asyncio.sleep(0.05)
+        assert len(started) == 2  # the others wait for a slot
+
+        tasks[-1].cancel()
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert results[:4] == [b""] * 4
+        assert isinstance(results[4], asyncio.CancelledError)
+        assert len(started) == 4
+
+    monkeypatch.setattr(PyAvatar, "stream", blocking_stream)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        configure_async(executor, max_concurrency=2)
+        try:
+            asyncio.run(main())
+        finally:
+            configure_async()
+
+
+def test_render_async_cancelled_renders_keep_their_slot(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    release = threading.Event()
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def blocking_stream(avatar, *args):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait()
+        with lock:
+            running[0] -= 1
+        return b""
+
+    async def main() -> None:
+        tasks = [asyncio.create_task(render_async(str(i))) for i in range(6)]
+        try:
+            await asyncio.sleep(0.05)
+            for task in tasks[:2]:  # both running in the executor
+                task.cancel()
+            await asyncio.sleep(0.05)
+            assert peak[0] == 2
+        finally:
+            release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert results[2:] == [b""] * 4
+        assert peak[0] == 2
+
+    monkeypatch.setattr(PyAvatar, "stream", blocking_stream)
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        configure_async(executor, max_concurrency=2)
+        try:
+            asyncio.run(main())
+        finally:
+            configure_async()
+
+
+def test_render_async_coalesces_identical_renders(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    stream = PyAvatar.stream
+    calls = []
+
+    def counting_stream(avatar, *args):
+        calls.append(avatar.text)
+        return stream(avatar, *args)
+
+    async def main() -> list[bytes]:
+        return await asyncio.gather(
+            *(render_async("smallwat3r", deterministic=True)
+              for _ in range(10)),
+            render_async("bob", deterministic=True))
+
+    monkeypatch.setattr(PyAvatar, "stream", counting_stream)
+    results = asyncio.run(main())
+    assert len(set(results[:10])) == 1
+    assert sorted(calls) == ["B", "S"]
@@ -0,0 +1,45 @@
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from pyavatar import (ImageExtensionNotSupportedError,
+                      PyAvatar,
+                      RenderingSizeError,
+                      build_atlas)
+
+
+def test_build_atlas_matches_avatars() -> None:
+    atlas = build_atlas("ABCAD", size=64, columns=3, seed="s")
+    assert atlas.offsets == {
+        "A": (0, 0), "B": (64, 0), "C": (128, 0), "D": (0, 64)
+    }
+    sheet = Image.open(io.BytesIO(atlas.data)).convert("RGB")
+    assert sheet.size == (atlas.width, atlas.height) == (192, 128)
+    for char, (x, y) in atlas.offsets.items():
+        avatar = PyAvatar(char, size=64, deterministic=True, seed="s")
+        sprite = sheet.crop((x, y, x + 64, y + 64))
+        assert sprite.tobytes() == avatar.image.tobytes()
+
+
+def test_build_atlas_manifest_and_css() -> None:
+    atlas = build_atlas("AB", size=50, color="#000000")
+    manifest = json.loads(atlas.manifest_json())
+    assert manifest["format"] == "png"
+    assert manifest["sprites"]["B"] == {"x": 50, "y": 0}
+    css = atlas.css("/avatars.png")
+    assert 'url("/avatars.png")' in css
+    assert ".avatar-42 { background-position: -50px -0px; }" in css
+    assert "data:image/png;base64," in atlas.css()
+
+
+def test_build_atlas_errors() -> None:
+    with pytest.raises(ValueError):
+        build_atlas("")
+    with pytest.raises(ValueError):
+        build_atlas(["AB"])
+    with pytest.raises(RenderingSizeError):
+        build_atlas("A", size=10)
+    with pytest.raises(ImageExtensionNotSupportedError):
+        build_atlas("A", fmt="bmp")
@@ -0,0 +1,112 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+
+import pytest
+
+from pyavatar import (ImageExtensionNotSupportedError,
+                      PyAvatar,
+                      RenderingSizeError,
+                      generate_many,
+                      generate_many_processes,
+                      register_font)
+from pyavatar._avatar import _DEFAULT_FONT_FILEPATH
+
+NAMES = [f"user{i}" for i in range(50)] + ["alice", "bob", "carol"]
+
+
+def test_generate_many_in_order() -> None:
+    results = list(
+        generate_many(NAMES,
+                      size=80,
+                      fmt="jpeg",
+                      workers=4,
+                      deterministic=True))
+    expected = [
+        PyAvatar(name, size=80, deterministic=True).stream("jpeg")
+        for name in NAMES
+    ]
+    assert results == expected
+
+
+def test_generate_many_is_lazy() -> None:
+    consumed = []
+
+    def items():
+        for name in NAMES:
+            consumed.append(name)
+            yield name
+
+    results = generate_many(items(), workers=2)
+    next(results)
+    assert len(consumed) <= 5
+    results.close()
+
+
+def test_generate_many_errors() -> None:
+    with pytest.raises(ImageExtensionNotSupportedError):
+        next(generate_many(NAMES, fmt="nope"))
+
+    with pytest.raises(RenderingSizeError):
+        next(generate_many(NAMES, size=10))
+
+
+def test_generate_many_processes() -> None:
+    results = list(
+        generate_many_processes(NAMES,
+                                size=80,
+                                workers=2,
+                                chunksize=8,
+                                warm="UAB",
+                                deterministic=True))
+    expected = [
+        PyAvatar(name, size=80, deterministic=True).stream() for name in NAMES
+    ]
+    assert results == expected
+
+
+def test_generate_many_processes_font_name() -> None:
+    results = list(
+        generate_many_processes(NAMES[:4],
+                                size=80,
+                                workers=1,
+                                warm="U",
+                                fontpath="lora",
+                                deterministic=True))
+    expected = [
+        PyAvatar(name, size=80, deterministic=True).stream()
+        for name in NAMES[:4]
+    ]
+    assert results == expected
+
+
+def test_generate_many_processes_spawn(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    with open(_DEFAULT_FONT_FILEPATH, "rb") as f:
+        register_font("lora-spawned", f.read())
+    monkeypatch.setattr(
+        "pyavatar._batch.ProcessPoolExecutor",
+        partial(ProcessPoolExecutor, mp_context=get_context("spawn")))
+    results = list(
+        generate_many_processes(NAMES[:4],
+                                size=80,
+                                workers=1,
+                                warm="U",
+                                fontpath="lora-spawned",
+                                deterministic=True))
+    expected = [
+        PyAvatar(name, size=80, fontpath="lora-spawned",
+                 deterministic=True).stream() for name in NAMES[:4]
+    ]
+    assert results == expected
+
+
+def test_generate_many_processes_errors() -> None:
+    with pytest.raises(RenderingSizeError):
+        generate_many_processes(NAMES, size=10)
+
+    with pytest.raises(ValueError):
+        generate_many_processes(NAMES, chunksize=0)
+
+    with pytest.raises(ImageExtensionNotSupportedError):
+        generate_many_processes(NAMES, fmt="nope")
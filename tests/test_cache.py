@@ -0,0 +1,54 @@
+import pytest
+
+from pyavatar._cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache: LRUCache[str, int] = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.info() == (3, 0, 1, 2, 2)
+
+
+def test_lru_cache_weighted() -> None:
+    cache: LRUCache[str, bytes] = LRUCache(10, weigh=len)
+    cache.put("a", b"12345")
+    cache.put("b", b"123456")
+    assert "a" not in cache
+    assert cache.info().currsize == 6
+
+    cache.put("c", b"x" * 11)  # larger than the cache itself
+    assert "c" not in cache
+
+
+def test_lru_cache_resize_and_clear() -> None:
+    cache: LRUCache[int, int] = LRUCache(3)
+    for i in range(3):
+        cache.put(i, i)
+    cache.resize(1)
+    assert len(cache) == 1 and 2 in cache
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.info() == (0, 0, 0, 1, 0)
+
+    with pytest.raises(ValueError):
+        cache.resize(-1)
+
+
+def test_lru_cache_discard() -> None:
+    cache: LRUCache[tuple[str, int], bytes] = LRUCache(10, weigh=len)
+    cache.put(("a", 1), b"123")
+    cache.put(("b", 1), b"45")
+    cache.put(("a", 2), b"6")
+    cache.discard(lambda key: key[0] == "a")
+
+    assert ("a", 1) not in cache and ("a", 2) not in cache
+    assert cache.get(("b", 1)) == b"45"
+    assert cache.info() == (1, 0, 0, 10, 2)
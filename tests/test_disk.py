@@ -0,0 +1,80 @@
+import os
+import tempfile
+from typing import Iterator
+
+import pytest
+
+from pyavatar import CacheInfo, DiskCache, PyAvatar, set_cache_backend
+
+
+@pytest.fixture
+def directory() -> Iterator[str]:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield temp_dir
+
+
+def test_disk_cache_layout(directory: str) -> None:
+    cache = DiskCache(directory)
+    key = "abcdef" + "0" * 58
+    assert cache.get(key) is None
+
+    cache.put(key, b"avatar")
+    assert cache.get(key) == b"avatar"
+    assert os.listdir(os.path.join(directory, "ab", "cd")) == [key]
+
+    cache.clear()
+    assert cache.get(key) is None
+
+
+def test_disk_cache_evicts_least_recently_accessed(directory: str) -> None:
+    cache = DiskCache(directory, max_bytes=30)
+    for i, key in enumerate(("aa00", "bb00", "cc00")):
+        cache.put(key, b"x" * 10)
+        os.utime(cache._path(key), (i, i))
+    os.utime(cache._path("aa00"), (10, 10))  # most recently accessed
+
+    cache.put("dd00", b"x" * 10)
+    assert cache.get("bb00") is None
+    assert cache.get("cc00") is None
+    assert cache.get("aa00") == cache.get("dd00") == b"x" * 10
+
+
+def test_disk_cache_size_cap_holds_across_processes(directory: str) -> None:
+    caches = [DiskCache(directory, max_bytes=30) for _ in range(2)]
+    for i in range(6):  # each cache stands for a process
+        caches[i % 2].put(f"{i:02x}00", b"x" * 10)
+        assert caches[0]._measure() <= 30
+
+    caches[0].clear()
+    caches[1].put("aa00", b"x" * 10)
+    caches[1].put("aa00", b"x" * 20)  # replaced, not added
+    caches[0].put("bb00", b"x" * 10)
+    assert caches[0]._measure() == 30
+    assert caches[1].get("aa00") == b"x" * 20
+
+
+def test_disk_cache_info(directory: str) -> None:
+    cache = DiskCache(os.path.join(directory, "cache"), max_bytes=30)
+    assert cache.info() == (0, 0, 0, 30, 0)
+    for key in ("aa00", "bb00", "cc00", "dd00"):
+        cache.put(key, b"x" * 10)
+    cache.get("dd00")
+    cache.get("aa00")
+    assert cache.info() == CacheInfo(1, 1, 2, 30, 20)
+    assert DiskCache(cache.directory).info().currsize == 20
+
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 30, 0)
+
+
+def test_avatar_uses_disk_cache(directory: str,
+                                monkeypatch: pytest.MonkeyPatch) -> None:
+    set_cache_backend(DiskCache(directory))
+    try:
+        data = PyAvatar("smallwat3r", color=(1, 2, 3)).stream("jpeg")
+        assert len(list(os.walk(directory))) == 3
+
+        monkeypatch.setattr(PyAvatar, "image", None)  # no rendering allowed
+        assert PyAvatar("sam", color="#010203").stream("jpeg") == data
+    finally:
+        set_cache_backend(None)
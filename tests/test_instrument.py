@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from pyavatar import (PyAvatar,
+                      RenderStats,
+                      _instrument,
+                      add_render_hook,
+                      clear_font_cache,
+                      clear_glyph_cache,
+                      clear_output_cache,
+                      collect_renders,
+                      generate_many,
+                      remove_render_hook,
+                      set_output_cache_size)
+
+
+def test_collect_renders_stages() -> None:
+    clear_font_cache()
+    clear_glyph_cache()
+    with collect_renders() as renders:
+        avatar = PyAvatar("smallwat3r", size=200, color="#000")
+        data = avatar.stream("jpeg")
+        avatar.stream("jpeg")  # memoized, not a render
+        avatar.stream("png")
+    assert not _instrument.enabled
+
+    jpeg, png = renders
+    assert (jpeg.text, jpeg.size, jpeg.format) == ("S", 200, "jpeg")
+    assert jpeg.profile == "balanced"
+    assert jpeg.bytes == len(data)
+    assert set(jpeg.durations) == {
+        "font_load", "measure", "rasterize", "composite", "encode"
+    }
+    assert jpeg.misses == {"font": 1, "glyph": 1}
+    assert sum(jpeg.durations.values()) <= jpeg.duration
+    # The glyph is kept by the avatar
+    assert set(png.durations) == {"composite", "encode"}
+    assert png.hits == png.misses == {}
+
+
+def test_collect_image_render() -> None:
+    PyAvatar("A").image
+    with collect_renders() as renders:
+        PyAvatar("A").image
+    (render, ) = renders
+    assert render.format is None and render.bytes == 0
+    assert render.hits == {"glyph": 1}
+    assert set(render.durations) == {"composite"}
+
+
+def test_output_cache_lookups() -> None:
+    set_output_cache_size(2**20)
+    try:
+        with collect_renders() as renders:
+            PyAvatar("a", color="#fff").stream()
+            PyAvatar("a", color="#fff").stream()
+        assert renders[0].misses["output"] == 1
+        assert renders[1].hits == {"output": 1}
+        assert renders[1].durations == {}
+    finally:
+        set_output_cache_size(0)
+        clear_output_cache()
+
+
+def test_render_hooks() -> None:
+    received: list[RenderStats] = []
+    threads = set()
+
+    def hook(stats: RenderStats) -> None:
+        received.append(stats)
+        threads.add(threading.get_ident())
+
+    add_render_hook(hook)
+    try:
+        assert _instrument.enabled
+        with collect_renders() as renders:
+            results = list(
+                generate_many(["a", "b", "c"], fmt="svg", deterministic=True))
+        assert renders == []  # rendered by other threads
+    finally:
+        remove_render_hook(hook)
+    assert not _instrument.enabled
+    assert sorted(stats.bytes for stats in received) == sorted(
+        len(data) for data in results)
+    assert threading.get_ident() not in threads
+
+
+def test_failing_render_hook(caplog: pytest.LogCaptureFixture) -> None:
+
+    def hook(stats: RenderStats) -> None:
+        raise RuntimeError("boom")
+
+    add_render_hook(hook)
+    try:
+        avatar = PyAvatar("smallwat3r", deterministic=True)
+        assert avatar.stream("svg").startswith(b"<svg")
+    finally:
+        remove_render_hook(hook)
+    assert caplog.records[0].name == "pyavatar"
+    assert caplog.records[0].exc_info[0] is RuntimeError
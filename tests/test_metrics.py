@@ -0,0 +1,83 @@
+import re
+import tempfile
+
+import pytest
+
+from pyavatar import (DiskCache,
+                      PyAvatar,
+                      _instrument,
+                      disable_metrics,
+                      enable_metrics,
+                      render_metrics,
+                      set_cache_backend)
+from pyavatar._metrics import Counter, Histogram, MetricsRegistry, _Metric
+
+
+def sample(text: str, name: str) -> float:
+    match = re.search(rf"^{re.escape(name)} (\S+)$", text, re.MULTILINE)
+    assert match, name
+    return float(match.group(1))
+
+
+def test_registry_exposition() -> None:
+    registry = MetricsRegistry()
+    counter = Counter("things_total", "Things.\nCounted.", ("kind", ))
+    histogram = Histogram("wait_seconds", "Waits.", buckets=(0.1, 1.0))
+    registry.register(counter)
+    registry.register(histogram)
+    counter.inc('a"b\\')
+    counter.inc('a"b\\', amount=2)
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value=value)
+    assert registry.render() == ("# HELP things_total Things.\\nCounted.\n"
+                                 "# TYPE things_total counter\n"
+                                 'things_total{kind="a\\"b\\\\"} 3.0\n'
+                                 "# HELP wait_seconds Waits.\n"
+                                 "# TYPE wait_seconds histogram\n"
+                                 'wait_seconds_bucket{le="0.1"} 1.0\n'
+                                 'wait_seconds_bucket{le="1.0"} 2.0\n'
+                                 'wait_seconds_bucket{le="+Inf"} 3.0\n'
+                                 "wait_seconds_sum 5.55\n"
+                                 "wait_seconds_count 3.0\n")
+
+
+def test_metric_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        _Metric("things", "Things.")  # type: ignore[abstract]
+
+
+def test_render_metrics() -> None:
+    before = render_metrics()
+    enable_metrics()
+    enable_metrics()  # only counted once
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            set_cache_backend(DiskCache(temp_dir))
+            try:
+                data = PyAvatar("a", color="#000").stream("jpeg")
+                PyAvatar("a", color="#000").stream("jpeg")
+                backend = render_metrics()
+            finally:
+                set_cache_backend(None)
+    finally:
+        disable_metrics()
+    assert not _instrument.enabled
+    after = render_metrics()
+
+    def delta(name: str) -> float:
+        previous = sample(before, name) if name in before else 0
+        return sample(after, name) - previous
+
+    for result in ("render", "hit"):
+        assert delta('pyavatar_renders_total{format="jpeg",profile="balanced",'
+                     f'result="{result}"}}') == 1
+        assert delta('pyavatar_render_duration_seconds_count{format="jpeg",'
+                     f'result="{result}"}}') == 1
+    assert delta('pyavatar_output_bytes_total{format="jpeg"}') == 2 * len(data)
+    assert delta('pyavatar_stage_duration_seconds_count{stage="encode"}') == 1
+    assert delta('pyavatar_backend_lookups_total{result="hit"}') == 1
+    assert delta('pyavatar_backend_lookups_total{result="miss"}') == 1
+    assert sample(after, 'pyavatar_cache_max_size{cache="glyph"}') == 1024
+    assert 'cache="backend"' not in after
+    assert sample(backend, 'pyavatar_cache_size{cache="backend"}') == len(data)
+    assert sample(backend, 'pyavatar_cache_hits_total{cache="backend"}') == 1
@@ -1,16 +1,41 @@
+import gc
+import mmap
 import os
+import shutil
 import tempfile
+import zipfile
+from base64 import b64encode
+from io import BytesIO
 from typing import Any
 
 import pytest
+from PIL import Image, ImageDraw, ImageFont
 
-from pyavatar import (FontExtensionNotSupportedError,
+from pyavatar import (EncodeProfile,
+                      EncodeProfileNotSupportedError,
+                      FontDataError,
+                      FontExtensionNotSupportedError,
                       FontpathError,
                       ImageExtensionNotSupportedError,
                       PyAvatar,
                       RenderingSizeError,
                       SupportedImageFmt,
-                      SupportedPixelRange)
+                      SupportedPixelRange,
+                      available_formats,
+                      clear_font_cache,
+                      clear_glyph_cache,
+                      clear_output_cache,
+                      color_from_text,
+                      font_cache_info,
+                      glyph_cache_info,
+                      output_cache_info,
+                      register_font,
+                      set_default_encode_profile,
+                      set_font_cache_size,
+                      set_glyph_cache_size,
+                      set_output_cache_size,
+                      warmup)
+from pyavatar._fonts import font_digest
 
 
 def test_avatar_attributes() -> None:
@@ -102,7 +127,7 @@ def test_save_avatar_locally() -> None:
 
         assert str(excinfo.value) == ("test.nope -> Image extension not "
                                       "supported. Supported formats: "
-                                      "png, jpeg, ico.")
+                                      "png, jpeg, ico, svg, webp, avif.")
 
 
 def test_stream_avatar() -> None:
@@ -115,12 +140,381 @@ def test_stream_avatar() -> None:
 
     assert str(excinfo.value) == ("unknown -> Image extension not "
                                   "supported. Supported formats: "
-                                  "png, jpeg, ico.")
+                                  "png, jpeg, ico, svg, webp, avif.")
 
 
-@pytest.mark.parametrize("format", tuple(SupportedImageFmt))
+@pytest.mark.parametrize("format", available_formats())
 def test_save_avatar_as_base64(format: str):
     avatar = PyAvatar("smallwat3r")
     image = avatar.base64_image(format)
     assert isinstance(image, str)
     assert format in image[:20]
+
+
+def test_font_cache() -> None:
+    clear_font_cache()
+    clear_glyph_cache()
+    PyAvatar("smallwat3r", size=100).image
+    PyAvatar("bob", size=100).image
+    PyAvatar("smallwat3r", size=200).image
+
+    info = font_cache_info()
+    assert info.misses == 2
+    assert info.hits == 1
+    assert info.currsize == 2
+
+    set_font_cache_size(1)
+    assert font_cache_info().currsize == 1
+    assert font_cache_info().evictions == 1
+
+    set_font_cache_size(64)
+    clear_font_cache()
+    assert font_cache_info().currsize == 0
+
+
+def test_glyph_cache() -> None:
+    clear_glyph_cache()
+    PyAvatar("smallwat3r").image
+    PyAvatar("Sam").image
+    PyAvatar("bob").image
+
+    info = glyph_cache_info()
+    assert info.misses == 2
+    assert info.hits == 1
+    assert info.currsize == 2
+
+
+@pytest.mark.parametrize("text", ("S", "g", "@", " "))
+def test_glyph_composite_matches_direct_drawing(text: str) -> None:
+    avatar = PyAvatar(text, size=150, color=(20, 120, 220), capitalize=False)
+
+    expected = Image.new(mode="RGB", size=(150, 150), color=(20, 120, 220))
+    font = ImageFont.truetype(avatar.fontpath, size=90)
+    draw = ImageDraw.Draw(expected)
+    _, _, w_txt, h_txt = draw.textbbox((0, 0), text, font)
+    off_x, off_y, _, _ = font.getbbox(text)
+    draw.text((75 - (w_txt + off_x) / 2, 75 - (h_txt + off_y) / 2),
+              text,
+              font=font)
+    assert avatar.image.tobytes() == expected.tobytes()
+
+
+def test_lazy_rendering() -> None:
+    clear_glyph_cache()
+    avatar = PyAvatar("smallwat3r", color=(1, 1, 1))
+    avatar.change_color((2, 2, 2))
+    assert str(avatar) == "S 120x120 (2, 2, 2)"
+    assert glyph_cache_info().misses == 0
+
+    image = avatar.image
+    assert avatar.image is image
+    assert image.getpixel((0, 0)) == (2, 2, 2)
+    assert glyph_cache_info().misses == 1
+
+    avatar.color = (3, 3, 3)
+    assert avatar.image is not image
+    assert avatar.image.getpixel((0, 0)) == (3, 3, 3)
+
+    avatar.size = 60
+    assert avatar.image.size == (60, 60)
+
+    avatar.text = "bob"
+    assert avatar.image.getpixel((0, 0)) == (3, 3, 3)
+    assert glyph_cache_info().misses == 3
+
+
+def test_image_edits() -> None:
+    set_output_cache_size(1024 * 1024)
+    try:
+        avatar = PyAvatar("smallwat3r", color=(40, 176, 200))
+        ImageDraw.Draw(avatar.image).rectangle((0, 0, 30, 30), fill="black")
+        for fmt in ("png", "jpeg", "ico"):
+            output = Image.open(BytesIO(avatar.stream(fmt))).convert("RGB")
+            assert output.getpixel((5, 5)) != (0, 0, 0)
+
+        avatar.image = avatar.image
+        for fmt in ("png", "jpeg", "ico"):
+            output = Image.open(BytesIO(avatar.stream(fmt))).convert("RGB")
+            assert output.getpixel((5, 5)) == (0, 0, 0)
+        with pytest.raises(ImageExtensionNotSupportedError):
+            avatar.stream("svg")
+        with pytest.raises(TypeError):
+            avatar.image = b"not an image"  # type: ignore[assignment]
+
+        other = PyAvatar("smallwat3r", color=(40, 176, 200))
+        output = Image.open(BytesIO(other.stream("png"))).convert("RGB")
+        assert output.getpixel((5, 5)) != (0, 0, 0)
+
+        avatar.color = (40, 176, 200)  # discards the assigned image
+        assert avatar.stream("png") == other.stream("png")
+    finally:
+        set_output_cache_size(0)
+
+
+def test_recolor_keeps_glyph(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_glyph_cache_size(0)
+    try:
+        avatar = PyAvatar("smallwat3r", size=250, color=(1, 1, 1))
+        avatar.image
+        monkeypatch.setattr("pyavatar._glyphs._rasterize", None)
+        for color in ((2, 2, 2), (40, 176, 200), (0, 0, 0)):
+            avatar.change_color(color)
+            assert avatar.image.getpixel((0, 0)) == color
+        monkeypatch.undo()
+        expected = PyAvatar("smallwat3r", size=250, color=(0, 0, 0))
+        assert avatar.image.tobytes() == expected.image.tobytes()
+    finally:
+        set_glyph_cache_size(1024)
+
+
+def test_stream_is_memoized_per_format() -> None:
+    avatar = PyAvatar("smallwat3r", color=(1, 1, 1))
+    png = avatar.stream("png")
+    assert avatar.stream(SupportedImageFmt.PNG) is png
+    assert avatar.stream("jpeg") is not png
+    assert avatar.base64_image("png").endswith(b64encode(png).decode("utf-8"))
+
+    avatar.change_color((2, 2, 2))
+    assert avatar.stream("png") != png
+
+
+def test_shared_output_cache() -> None:
+    clear_output_cache()
+    set_output_cache_size(0)
+    PyAvatar("smallwat3r", color="#010101").stream()
+    assert output_cache_info().currsize == 0
+
+    set_output_cache_size(1_000_000)
+    png = PyAvatar("smallwat3r", color="#010101").stream()
+    assert PyAvatar("sam", color=(1, 1, 1)).stream() is png
+    assert PyAvatar("sam", color=(1, 1, 2)).stream() is not png
+
+    info = output_cache_info()
+    assert info.hits == 1
+    assert 0 < info.currsize <= 1_000_000
+
+    set_output_cache_size(0)
+    assert output_cache_info().currsize == 0
+    clear_output_cache()
+
+
+def test_deterministic_color() -> None:
+    avatar = PyAvatar("smallwat3r", deterministic=True)
+    same = PyAvatar("smallwat3r", deterministic=True)
+    assert avatar.color == same.color == color_from_text("smallwat3r")
+    assert avatar.stream() == same.stream()
+
+    assert PyAvatar("sam", deterministic=True).color != avatar.color
+    assert PyAvatar("smallwat3r", deterministic=True,
+                    seed="salt").color != avatar.color
+    assert PyAvatar("smallwat3r", deterministic=True,
+                    color="#999").color == "#999"
+
+
+def test_deterministic_color_from_palette() -> None:
+    palette = ("#111", (2, 2, 2))
+    colors = {color_from_text(str(i), palette=palette) for i in range(20)}
+    assert colors == set(palette)
+
+
+@pytest.mark.parametrize("format", available_formats())
+def test_encode_profiles(format: str) -> None:
+    avatar = PyAvatar("smallwat3r", size=250, color=(40, 176, 200))
+    fastest = avatar.stream(format, "fastest")
+    smallest = avatar.stream(format, EncodeProfile.SMALLEST)
+    assert len(smallest) <= len(fastest)
+
+    set_default_encode_profile("smallest")
+    assert avatar.stream(format) is smallest
+    set_default_encode_profile(EncodeProfile.BALANCED)
+
+
+def test_encode_profile_validation() -> None:
+    avatar = PyAvatar("smallwat3r")
+    with pytest.raises(EncodeProfileNotSupportedError) as excinfo:
+        avatar.stream("png", "nope")
+
+    assert str(excinfo.value) == ("nope -> Encode profile not supported. "
+                                  "Supported profiles: fastest, balanced, "
+                                  "smallest.")
+
+    with pytest.raises(EncodeProfileNotSupportedError):
+        set_default_encode_profile("nope")
+
+
+@pytest.mark.parametrize("color", ((40, 176, 200), "#fff", (0, 0, 0)))
+def test_png_palette_output(color: Any) -> None:
+    avatar = PyAvatar("smallwat3r", size=250, color=color)
+
+    balanced = Image.open(BytesIO(avatar.stream("png", "balanced")))
+    assert balanced.mode == "P"
+    assert balanced.convert("RGB").tobytes() == avatar.image.tobytes()
+
+    fastest = Image.open(BytesIO(avatar.stream("png", "fastest")))
+    assert fastest.mode == "P"
+    assert len(fastest.getcolors()) <= 16
+    background = avatar.image.getpixel((0, 0))
+    assert fastest.convert("RGB").getpixel((0, 0)) == background
+
+
+def test_warmup() -> None:
+    clear_glyph_cache()
+    warmup("AB", sizes=(60, 120), freeze=False)
+    assert glyph_cache_info().currsize == 4
+    assert gc.get_freeze_count() == 0
+
+    PyAvatar("bob", size=60).image
+    assert glyph_cache_info().hits == 1
+
+    warmup("C", sizes=(60, ))
+    try:
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_warmup_registered_font() -> None:
+    clear_glyph_cache()
+    warmup("A", fonts=("lora", ), freeze=False)
+    PyAvatar("alice", fontpath="lora").image
+    assert glyph_cache_info().hits == 1
+
+    with pytest.raises(FontpathError):
+        warmup("A", fonts=("no-such-font", ), freeze=False)
+
+
+def test_validated_fontpath_is_trusted_until_loading_fails(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fontpath = shutil.copy(PyAvatar("a").fontpath, f"{temp_dir}/a.ttf")
+        PyAvatar("smallwat3r", fontpath=fontpath)
+
+    with monkeypatch.context() as m:
+        m.setattr(os.path, "exists", lambda path: pytest.fail("stat"))
+        avatar = PyAvatar("smallwat3r", fontpath=fontpath)
+    with pytest.raises(OSError):
+        avatar.image
+    with pytest.raises(FontpathError):
+        PyAvatar("smallwat3r", fontpath=fontpath)
+
+
+def test_register_font(monkeypatch: pytest.MonkeyPatch) -> None:
+    default_fontpath = PyAvatar("smallwat3r").fontpath
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fontpath = shutil.copy(default_fontpath, f"{temp_dir}/font.ttf")
+        register_font("test-font", fontpath)
+
+    def no_stat(path: str) -> None:
+        raise AssertionError("unexpected I/O")
+
+    monkeypatch.setattr(os, "stat", no_stat)
+    assert PyAvatar("smallwat3r").fontpath == default_fontpath
+    assert PyAvatar("smallwat3r", fontpath="lora").fontpath == default_fontpath
+    assert PyAvatar("smallwat3r", fontpath="test-font").fontpath == fontpath
+    assert PyAvatar("smallwat3r", fontpath=fontpath).fontpath == fontpath
+
+    monkeypatch.undo()
+    with pytest.raises(FontpathError):
+        register_font("nope", "idonotexist.ttf")
+
+
+def test_register_font_from_memory() -> None:
+    fontpath = PyAvatar("smallwat3r").fontpath
+    with open(fontpath, "rb") as f:
+        data = f.read()
+        register_font("from-bytes", data)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            register_font("from-mmap", mapped)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with zipfile.ZipFile(f"{temp_dir}/fonts.zip", "w") as archive:
+            archive.writestr("fonts/Lora.ttf", data)
+            archive.writestr("fonts/Lora.txt", data)
+        with zipfile.ZipFile(f"{temp_dir}/fonts.zip") as archive:
+            register_font("from-zip", zipfile.Path(archive, "fonts/Lora.ttf"))
+            with pytest.raises(FontExtensionNotSupportedError):
+                register_font("nope", zipfile.Path(archive, "fonts/Lora.txt"))
+
+    expected = PyAvatar("smallwat3r", size=80, color=(1, 2, 3)).stream()
+    for name in ("from-bytes", "from-mmap", "from-zip"):
+        avatar = PyAvatar("smallwat3r",
+                          size=80,
+                          color=(1, 2, 3),
+                          fontpath=name)
+        assert avatar.fontpath == name
+        assert avatar.stream() == expected
+
+    with pytest.raises(FontDataError):
+        register_font("nope", b"not a font")
+    with pytest.raises(TypeError):
+        register_font("nope", 123)  # type: ignore[arg-type]
+
+
+def test_register_font_again() -> None:
+    with open(PyAvatar("smallwat3r").fontpath, "rb") as f:
+        data = f.read()
+    set_output_cache_size(1024 * 1024)
+    try:
+        register_font("replaced", data)
+        avatar = PyAvatar("W", fontpath="replaced", color=(1, 2, 3))
+        avatar.stream()
+        digest = font_digest("replaced")
+        glyphs = glyph_cache_info().currsize
+        assert output_cache_info().currsize > 0
+
+        register_font("replaced", data + bytes(4))  # trailing padding
+        assert output_cache_info().currsize == 0
+        assert glyph_cache_info().currsize == glyphs - 1
+        assert font_digest("replaced") != digest
+    finally:
+        set_output_cache_size(0)
+
+
+def test_font_digest_of_changed_file() -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fontpath = shutil.copy(PyAvatar("a").fontpath, f"{temp_dir}/a.ttf")
+        digest = font_digest(fontpath)
+        with open(fontpath, "ab") as f:
+            f.write(bytes(4))
+        stat = os.stat(fontpath)
+        os.utime(fontpath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert font_digest(fontpath) != digest
+
+
+@pytest.mark.parametrize("color", ((242, 33, 6), (40, 176, 200)))
+def test_webp_smallest(color: Any) -> None:
+    if SupportedImageFmt.WEBP not in available_formats():
+        pytest.skip("Pillow is built without WebP")
+    avatar = PyAvatar("smallwat3r", size=250, color=color)
+    smallest = avatar.stream("webp", "smallest")
+    for profile in ("fastest", "balanced"):
+        assert len(smallest) <= len(avatar.stream("webp", profile))
+
+
+def test_webp_output() -> None:
+    if SupportedImageFmt.WEBP not in available_formats():
+        pytest.skip("Pillow is built without WebP")
+    avatar = PyAvatar("smallwat3r", size=250, color=(40, 176, 200))
+    lossless = Image.open(BytesIO(avatar.stream("webp", "balanced")))
+    assert lossless.format == "WEBP"
+    assert lossless.convert("RGB").tobytes() == avatar.image.tobytes()
+    lossy = Image.open(BytesIO(avatar.stream("webp", "smallest")))
+    assert lossy.size == (250, 250)
+    assert avatar.base64_image("webp").startswith("data:image/webp;base64,")
+
+
+def test_unavailable_format(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("PIL.Image.SAVE", {"PNG": None, "JPEG": None})
+    assert available_formats() == (SupportedImageFmt.PNG,
+                                   SupportedImageFmt.JPEG,
+                                   SupportedImageFmt.SVG)
+    avatar = PyAvatar("smallwat3r")
+    with pytest.raises(ImageExtensionNotSupportedError) as excinfo:
+        avatar.stream("avif")
+
+    assert str(excinfo.value) == ("avif -> Image extension not supported. "
+                                  "Pillow cannot encode it here, available "
+                                  "formats: png, jpeg, svg.")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with pytest.raises(ImageExtensionNotSupportedError):
+            avatar.save(f"{temp_dir}/me.ico")
@@ -0,0 +1,114 @@
+import fcntl
+import multiprocessing
+import os
+import tempfile
+from typing import Any, Iterator
+
+import pytest
+
+from pyavatar import (CacheInfo,
+                      PyAvatar,
+                      SharedMemoryCache,
+                      set_cache_backend)
+
+
+@pytest.fixture
+def path() -> Iterator[str]:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield os.path.join(temp_dir, "pyavatar")
+
+
+def _put(path: str, key: str, data: bytes) -> None:
+    SharedMemoryCache(path, slots=16, slot_size=1024).put(key, data)
+
+
+def test_shared_memory_cache_across_processes(path: str) -> None:
+    cache = SharedMemoryCache(path, slots=16, slot_size=1024)
+    assert cache.get("key") is None
+
+    process = multiprocessing.Process(target=_put,
+                                      args=(path, "key", b"avatar"))
+    process.start()
+    process.join()
+    assert cache.get("key") == b"avatar"
+
+    view = cache.get_view("key")
+    assert view is not None and view == b"avatar"
+    view.release()
+
+    cache.put("key", b"x" * 2000)  # larger than a slot
+    assert cache.get("key") == b"avatar"
+
+    cache.clear()
+    assert cache.get("key") is None
+    cache.close()
+
+
+def _hold_lock(cache: SharedMemoryCache, locked: Any, release: Any) -> None:
+    with cache._file_lock():
+        locked.set()
+        release.wait(10)
+
+
+def test_shared_memory_cache_locks_after_fork(path: str) -> None:
+    cache = SharedMemoryCache(path, slots=16, slot_size=1024)
+    context = multiprocessing.get_context("fork")
+    locked, release = context.Event(), context.Event()
+    process = context.Process(target=_hold_lock, args=(cache, locked, release))
+    process.start()
+    try:
+        assert locked.wait(10)
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(cache._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    finally:
+        release.set()
+        process.join()
+    cache.put("key", b"avatar")
+    assert cache.get("key") == b"avatar"
+    cache.close()
+
+
+def test_shared_memory_cache_replaces_oldest_candidate(path: str) -> None:
+    cache = SharedMemoryCache(path, slots=4, slot_size=64)
+    for i in range(20):
+        cache.put(str(i), str(i).encode())
+    assert [cache.get(str(i)) for i in range(16, 20)
+            ] == [str(i).encode() for i in range(16, 20)]
+    assert cache.get("0") is None
+    cache.close()
+
+
+def test_shared_memory_cache_info(path: str) -> None:
+    cache = SharedMemoryCache(path, slots=4, slot_size=64)
+    for i in range(6):
+        cache.put(str(i), b"x" * (i + 1))
+    cache.put("5", b"x" * 6)  # replaced, not evicted
+    assert cache.get("5") == b"x" * 6
+    assert cache.get("0") is None
+    assert cache.info() == CacheInfo(1, 1, 2, 4 * 16, 3 + 4 + 5 + 6)
+
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 4 * 16, 0)
+    cache.close()
+
+
+def test_shared_memory_cache_layout_mismatch(path: str) -> None:
+    SharedMemoryCache(path, slots=16, slot_size=1024).close()
+    with pytest.raises(ValueError):
+        SharedMemoryCache(path, slots=32, slot_size=1024)
+    with pytest.raises(ValueError):
+        SharedMemoryCache(path, slots=16, slot_size=16)
+
+
+def test_avatar_uses_shared_memory_cache(
+        path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = SharedMemoryCache(path)
+    set_cache_backend(cache)
+    try:
+        data = PyAvatar("smallwat3r", color=(1, 2, 3)).stream("jpeg")
+
+        monkeypatch.setattr(PyAvatar, "image", None)  # no rendering allowed
+        assert PyAvatar("sam", color="#010203").stream("jpeg") == data
+    finally:
+        set_cache_backend(None)
+        cache.close()
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyavatar._singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_single_flight_coalesces_concurrent_calls() -> None:
+    flights: SingleFlight[int] = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn() -> int:
+        calls.append(1)
+        release.wait()
+        return 42
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flights.do, "key", fn) for _ in range(4)]
+        while not calls:
+            pass
+        release.set()
+        assert [future.result() for future in futures] == [42] * 4
+
+    assert len(calls) == 1
+    assert flights.do("key", lambda: 1) == 1  # the call is not kept
+
+
+def test_single_flight_propagates_errors() -> None:
+    flights: SingleFlight[int] = SingleFlight()
+
+    def fn() -> int:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flights.do("key", fn)
+    assert flights.do("key", lambda: 1) == 1
+
+
+def test_async_single_flight_does_not_share_a_cancelled_call() -> None:
+    flights: AsyncSingleFlight[int] = AsyncSingleFlight()
+    calls = []
+
+    async def fn() -> int:
+        calls.append(1)
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            for _ in range(5):  # winds down over a few loop iterations
+                await asyncio.sleep(0)
+            raise
+        return 42
+
+    async def sleepy(result: int) -> int:
+        await asyncio.sleep(0.01)
+        return result
+
+    async def main() -> None:
+        first = asyncio.create_task(flights.do("key", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flights.do("key", lambda: sleepy(1)))
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == 1
+
+    asyncio.run(main())
+    assert len(calls) == 1
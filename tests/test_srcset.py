@@ -0,0 +1,61 @@
+import io
+
+import pytest
+from PIL import Image, ImageChops, ImageStat
+
+from pyavatar import (PyAvatar,
+                      RenderingSizeError,
+                      clear_output_cache,
+                      generate_srcset,
+                      set_output_cache_size)
+
+
+def test_generate_srcset() -> None:
+    images = generate_srcset("smallwat3r", (60, 120, 180, 100),
+                             color="#123456")
+    assert list(images) == [60, 120, 180, 100]
+    for size, data in images.items():
+        image = Image.open(io.BytesIO(data)).convert("RGB")
+        assert image.size == (size, size)
+        assert image.getpixel((0, 0)) == (0x12, 0x34, 0x56)
+    direct = PyAvatar("smallwat3r", size=180, color="#123456")
+    assert images[180] == direct.stream("png")
+    assert images[100] == PyAvatar("s", size=100, color="#123456").stream()
+
+
+def test_generate_srcset_reduces_exact_multiples() -> None:
+    images = generate_srcset("W", (60, 180), fmt="png", color="#000000")
+    reduced = Image.open(io.BytesIO(images[60])).convert("L")
+    direct = PyAvatar("W", size=60, color="#000000").image.convert("L")
+    assert reduced.tobytes() != direct.tobytes()
+    difference = ImageStat.Stat(ImageChops.difference(reduced, direct))
+    assert difference.mean[0] < 8
+
+
+def test_generate_srcset_keeps_cache_keys_apart() -> None:
+    set_output_cache_size(2**20)
+    try:
+        reduced = generate_srcset("W", (60, 120), color="#000000")[60]
+        direct = PyAvatar("W", size=60, color="#000000").stream()
+        assert reduced != direct
+    finally:
+        set_output_cache_size(0)
+        clear_output_cache()
+
+
+def test_generate_srcset_random_color_is_shared() -> None:
+    images = generate_srcset("a", (50, 100))
+    colors = {
+        Image.open(io.BytesIO(data)).convert("RGB").getpixel((0, 0))
+        for data in images.values()
+    }
+    assert len(colors) == 1
+
+
+def test_generate_srcset_errors() -> None:
+    with pytest.raises(ValueError):
+        generate_srcset("a", ())
+    with pytest.raises(RenderingSizeError):
+        generate_srcset("a", (120, 0))
+    with pytest.raises(RenderingSizeError):
+        generate_srcset("a", (120, 700))
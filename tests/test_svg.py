@@ -0,0 +1,71 @@
+import tempfile
+from xml.etree import ElementTree
+
+import pytest
+
+from pyavatar import (ImageExtensionNotSupportedError,
+                      PyAvatar,
+                      build_atlas,
+                      generate_many)
+from pyavatar._svg import forget_outlines
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def test_svg_skips_rasterization() -> None:
+    avatar = PyAvatar("smallwat3r", size=200, color=(40, 176, 200))
+    data = avatar.stream("svg")
+    assert avatar._image is None
+    root = ElementTree.fromstring(data)
+    assert root.get("viewBox") == "0 0 200 200"
+    assert root.find(f"{SVG}rect").get("fill") == "#28b0c8"
+    assert data == PyAvatar("s", size=200, color="#28b0c8").stream("svg")
+
+
+def test_svg_glyph_outline() -> None:
+    pytest.importorskip("fontTools")
+    data = PyAvatar("smallwat3r", color="#000").stream("svg")
+    path = ElementTree.fromstring(data).find(f"{SVG}path")
+    assert path.get("fill") == "#ffffff"
+    assert path.get("d").startswith("M")
+    blank = ElementTree.fromstring(PyAvatar(" ").stream("svg"))
+    assert blank.find(f"{SVG}path").get("d") == ""
+
+
+def test_svg_text_without_fonttools(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("pyavatar._svg.TTFont", None)
+    data = PyAvatar("<", color="#000").stream("svg")
+    text = ElementTree.fromstring(data).find(f"{SVG}text")
+    assert text.text == "<"
+    assert text.get("font-family") == "Lora, sans-serif"
+    assert text.get("font-size") == "72"
+
+
+def test_svg_replaces_characters_invalid_in_xml() -> None:
+    for char in ("\x01", "\x1f", "\ud800", "\uffff"):
+        data = PyAvatar(char, color="#000").stream("svg")
+        text = ElementTree.fromstring(data).find(f"{SVG}text")
+        assert text.text == "\ufffd"
+
+
+def test_svg_save_and_base64() -> None:
+    avatar = PyAvatar("smallwat3r")
+    assert avatar.base64_image("svg").startswith("data:image/svg+xml;base64,")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        avatar.save(f"{temp_dir}/me.svg")
+        with open(f"{temp_dir}/me.svg", "rb") as f:
+            assert f.read() == avatar.stream("svg")
+    with pytest.raises(ImageExtensionNotSupportedError):
+        build_atlas("AB", fmt="svg")
+
+
+def test_svg_outlines_threaded() -> None:
+    pytest.importorskip("fontTools")
+    names = [chr(code) for code in range(ord("A"), ord("Z") + 1)] * 4
+    for _ in range(10):
+        forget_outlines(PyAvatar("a").fontpath)  # reload the font
+        results = list(
+            generate_many(names, fmt="svg", workers=16, deterministic=True))
+        assert results == [
+            PyAvatar(name, deterministic=True).stream("svg") for name in names
+        ]